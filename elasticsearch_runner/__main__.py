@@ -1,20 +1,128 @@
 import os
+import sys
 
-import plac
+from elasticsearch_runner.configuration import generate_cluster_name
+from elasticsearch_runner.runner import (
+    ElasticsearchRunner,
+    ES_DEFAULT_VERSION,
+    fetch_pid_from_pid_file,
+    process_exists,
+)
 
-from elasticsearch_runner.runner import ElasticsearchRunner, ES_DEFAULT_VERSION
 
+def _runner(version):
+    # the engine outlives this process, so it must not write into a pipe we hold
+    return ElasticsearchRunner(
+        install_path=os.path.join(os.getcwd(), ".esrunner"),
+        version=version,
+        capture_output=False,
+    )
 
-@plac.annotations(
-    command=plac.Annotation(
-        "Start/stop or terminate engine", choices=["start", "stop", "terminate"]
-    ),
-    version=plac.Annotation("Elasticsearch engine version", kind="option", abbrev="v"),
-)
-def main(command: str, version: str = ES_DEFAULT_VERSION):
-    runner = ElasticsearchRunner(
-        install_path=os.path.join(os.getcwd(), ".esrunner"), version=version
+
+def status(version: str = ES_DEFAULT_VERSION) -> int:
+    """
+    Print whether the engine is running.
+
+    :rtype : int
+    :return: Exit code, 0 if running and 3 if not.
+    """
+    # reads the pid file of the cluster _runner would start, without the Java check of a runner
+    cluster_path = os.path.join(
+        os.getcwd(), ".esrunner", "%s-%s" % (version, generate_cluster_name())
     )
+    pid = fetch_pid_from_pid_file(os.path.join(cluster_path, ".pid"))
+
+    if pid and process_exists(pid):
+        print("Elasticsearch %s is running" % version)
+        return 0
+
+    print("Elasticsearch %s is not running" % version)
+    return 3
+
+
+def _fast_status(argv):
+    """
+    Handle "status [-v VERSION]" without loading plac, which alone takes longer to import than
+    the whole status check.
+
+    :rtype : int|None
+    :return: Exit code, or None if the arguments are not a plain status command.
+    """
+    if not argv or argv[0] != "status":
+        return None
+
+    if len(argv) == 1:
+        return status()
+
+    if len(argv) == 3 and argv[1] in ("-v", "--version"):
+        return status(argv[2])
+
+    if len(argv) == 2 and argv[1].startswith("--version="):
+        return status(argv[1][len("--version=") :])
+
+    return None
+
+
+def matrix(versions: str, pytest_args) -> int:
+    """
+    Run pytest against every version in a comma separated list, side by side.
+
+    :rtype : int
+    :return: Exit code, 0 if the tests passed for all versions and 1 otherwise.
+    """
+    from elasticsearch_runner.matrix import format_results, pytest_test, run_matrix
+
+    # "--" only separates the pytest arguments from ours
+    if pytest_args and pytest_args[0] == "--":
+        pytest_args = pytest_args[1:]
+
+    results = run_matrix(
+        [v.strip() for v in versions.split(",") if v.strip()],
+        pytest_test(pytest_args),
+        install_path=os.path.join(os.getcwd(), ".esrunner"),
+    )
+    print(format_results(results))
+
+    return 0 if all(r.passed for r in results.values()) else 1
+
+
+def gc(budget: str) -> int:
+    """
+    Remove least recently used versions and stale cluster directories until the install path fits the
+    budget, f.ex "5g" or "1.5GB".
+
+    :rtype : int
+    :return: Exit code, always 0.
+    """
+    from elasticsearch_runner.cache import InstallCache
+    from elasticsearch_runner.util import parse_size
+
+    cache = InstallCache(os.path.join(os.getcwd(), ".esrunner"))
+    for entry in cache.gc(budget=parse_size(budget)):
+        print("Removed %s (%d MB)" % (entry.name, entry.size // 1024**2))
+
+    print("Install path uses %d MB" % (sum(e.size for e in cache.entries()) // 1024**2))
+
+    return 0
+
+
+def main(
+    command: str,
+    version: str = ES_DEFAULT_VERSION,
+    versions: str = "",
+    budget: str = "5g",
+    *pytest_args
+):
+    if command == "status":
+        return status(version)
+
+    if command == "gc":
+        return gc(budget)
+
+    if command == "matrix":
+        return matrix(versions or version, pytest_args)
+
+    runner = _runner(version)
     runner.install()
     runner.run()
 
@@ -23,4 +131,32 @@ def main(command: str, version: str = ES_DEFAULT_VERSION):
 
 
 if __name__ == "__main__":
-    plac.call(main)
+    exit_code = _fast_status(sys.argv[1:])
+
+    if exit_code is None:
+        import plac
+
+        main = plac.annotations(
+            command=plac.Annotation(
+                "Start/stop, terminate or show status of engine, run pytest against a version matrix "
+                "or clean up the install path",
+                choices=["start", "stop", "terminate", "status", "matrix", "gc"],
+            ),
+            version=plac.Annotation(
+                "Elasticsearch engine version", kind="option", abbrev="v"
+            ),
+            versions=plac.Annotation(
+                "Comma separated Elasticsearch versions for matrix",
+                kind="option",
+                abbrev="m",
+            ),
+            budget=plac.Annotation(
+                "Max size of the install path for gc, f.ex 5g or 1.5GB",
+                kind="option",
+                abbrev="b",
+            ),
+            pytest_args=plac.Annotation("pytest arguments for matrix"),
+        )(main)
+        exit_code = plac.call(main)
+
+    sys.exit(exit_code or 0)
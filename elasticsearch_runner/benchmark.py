@@ -0,0 +1,264 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from elasticsearch_runner.bulk import bulk_action
+from elasticsearch_runner.stats import percentile
+
+"""
+Small load generator for quick throughput and latency numbers of a running node.
+
+A workload spec describes an optional bulk indexing phase fed from an NDJSON file with one document per
+line, and query templates that are replayed by a number of concurrent workers for a fixed duration:
+
+    {
+        "index": "bench",
+        "bulk": {"file": "docs.ndjson", "batch_size": 500},
+        "queries": [
+            {"name": "match", "body": {"query": {"match": {"title": "{{term}}"}}}, "params": {"term": ["a", "b"]}}
+        ],
+        "concurrency": 4,
+        "duration": 30
+    }
+
+Every worker keeps its own HTTP session, so connections are pooled and reused. The report holds throughput,
+latency percentiles and error rates per operation and can be dumped as JSON.
+"""
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_WORKLOAD = {
+    "index": "elasticsearch_runner_benchmark",
+    "bulk": None,
+    "queries": [],
+    "concurrency": 4,
+    "duration": 30.0,
+    "delete_index": True,
+}
+
+
+def render(template, params, rnd=random):
+    """
+    Fill "{{name}}" placeholders in a query template with a random value of the named parameter. A string
+    that is only a placeholder is replaced by the value itself, so numbers and lists keep their type.
+
+    :param template: Query body with placeholders.
+    :type template: dict|list|str|unicode
+    :param params: Possible values for every placeholder name.
+    :type params: dict[str|unicode, list]
+    :return: The rendered query body.
+    """
+    if isinstance(template, dict):
+        return dict((k, render(v, params, rnd)) for k, v in template.items())
+
+    if isinstance(template, list):
+        return [render(v, params, rnd) for v in template]
+
+    if isinstance(template, str) and "{{" in template:
+        for name, values in params.items():
+            placeholder = "{{%s}}" % name
+            if template == placeholder:
+                return rnd.choice(values)
+            if placeholder in template:
+                template = template.replace(placeholder, str(rnd.choice(values)))
+
+    return template
+
+
+def load_workload(workload):
+    """
+    :param workload: Workload spec as dict, or the path to a JSON file with it. Relative bulk files are
+    resolved against the directory of the JSON file.
+    :type workload: dict|str|unicode
+    :rtype : dict
+    :return: The workload spec with defaults filled in.
+    """
+    base_path = os.getcwd()
+
+    if not isinstance(workload, dict):
+        base_path = os.path.dirname(os.path.abspath(workload))
+        with open(workload) as f:
+            workload = json.load(f)
+
+    spec = dict(DEFAULT_WORKLOAD)
+    spec.update(workload)
+
+    if spec["bulk"]:
+        bulk = dict({"batch_size": 500}, **spec["bulk"])
+        bulk["file"] = os.path.join(base_path, bulk["file"])
+        spec["bulk"] = bulk
+
+    return spec
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.docs = defaultdict(int)
+
+    def record(self, name, latency, ok, docs=0):
+        with self._lock:
+            if ok:
+                self.latencies[name].append(latency)
+                self.docs[name] += docs
+            else:
+                self.errors[name] += 1
+
+    def report(self, name, elapsed):
+        latencies = sorted(self.latencies[name])
+        requests_ok = len(latencies)
+        total = requests_ok + self.errors[name]
+
+        def ms(v):
+            return None if v is None else round(v * 1000, 3)
+
+        report = {
+            "requests": total,
+            "errors": self.errors[name],
+            "error_rate": float(self.errors[name]) / total if total else 0.0,
+            "elapsed": round(elapsed, 3),
+            "throughput": requests_ok / elapsed if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "mean": ms(sum(latencies) / requests_ok) if requests_ok else None,
+                "p50": ms(percentile(latencies, 50)),
+                "p95": ms(percentile(latencies, 95)),
+                "p99": ms(percentile(latencies, 99)),
+                "max": ms(latencies[-1]) if latencies else None,
+            },
+        }
+
+        if self.docs[name]:
+            report["docs"] = self.docs[name]
+            report["docs_per_second"] = (
+                self.docs[name] / elapsed if elapsed > 0 else 0.0
+            )
+
+        return report
+
+
+def _run_workers(concurrency, work):
+    threads = [
+        threading.Thread(
+            target=work, name="elasticsearch-benchmark-%d" % i, daemon=True
+        )
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _bulk_phase(base_url, spec, major_version, stats):
+    import requests
+
+    bulk = spec["bulk"]
+    lock = threading.Lock()
+    action = bulk_action(spec["index"], major_version)
+
+    with open(bulk["file"]) as f:
+
+        def next_batch():
+            with lock:
+                docs = []
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        docs.append(line)
+                    if len(docs) >= bulk["batch_size"]:
+                        break
+                return docs
+
+        def work():
+            with requests.Session() as session:
+                docs = next_batch()
+                while docs:
+                    body = "".join("%s\n%s\n" % (action, doc) for doc in docs)
+                    ok = False
+                    t0 = time.perf_counter()
+                    try:
+                        resp = session.post(
+                            "%s/_bulk" % base_url,
+                            data=body,
+                            headers={"Content-Type": "application/x-ndjson"},
+                        )
+                        ok = resp.ok and not resp.json().get("errors", False)
+                    except (requests.RequestException, ValueError):
+                        pass
+                    stats.record("bulk", time.perf_counter() - t0, ok, len(docs))
+                    docs = next_batch()
+
+        start = time.perf_counter()
+        _run_workers(spec["concurrency"], work)
+
+    return time.perf_counter() - start
+
+
+def _query_phase(base_url, spec, stats):
+    import requests
+
+    queries = spec["queries"]
+    end_time = time.perf_counter() + spec["duration"]
+    search_url = "%s/%s/_search" % (base_url, spec["index"])
+
+    def work():
+        rnd = random.Random()
+        with requests.Session() as session:
+            while time.perf_counter() < end_time:
+                query = rnd.choice(queries)
+                body = render(query.get("body", {}), query.get("params", {}), rnd)
+                ok = False
+                t0 = time.perf_counter()
+                try:
+                    ok = session.post(search_url, json=body).ok
+                except requests.RequestException:
+                    pass
+                stats.record(query["name"], time.perf_counter() - t0, ok)
+
+    start = time.perf_counter()
+    _run_workers(spec["concurrency"], work)
+
+    return time.perf_counter() - start
+
+
+def run_benchmark(port, version, workload):
+    """
+    Replay a workload against a node and measure it.
+
+    :param port: REST port of the node.
+    :type port: int
+    :param version: Elasticsearch version of the node, used for the bulk format.
+    :type version: str|unicode
+    :param workload: Workload spec as dict, or the path to a JSON file with it.
+    :type workload: dict|str|unicode
+    :rtype : dict
+    :return: Report with throughput, latency percentiles in milliseconds and error rate per operation.
+    """
+    import requests
+
+    spec = load_workload(workload)
+    base_url = "http://localhost:%d" % port
+    major_version = int(version.split(".")[0])
+    stats = _Stats()
+    report = {"concurrency": spec["concurrency"], "operations": {}}
+
+    if spec["bulk"]:
+        elapsed = _bulk_phase(base_url, spec, major_version, stats)
+        report["operations"]["bulk"] = stats.report("bulk", elapsed)
+        requests.post("%s/%s/_refresh" % (base_url, spec["index"]))
+
+    if spec["queries"]:
+        elapsed = _query_phase(base_url, spec, stats)
+        for query in spec["queries"]:
+            report["operations"][query["name"]] = stats.report(query["name"], elapsed)
+
+    if spec["delete_index"] and spec["bulk"]:
+        requests.delete("%s/%s" % (base_url, spec["index"]))
+
+    return report
@@ -0,0 +1,27 @@
+import json
+
+"""
+Helpers for the bulk API, whose format changed between Elasticsearch versions.
+"""
+
+
+def bulk_action(index, major_version, doc_id=None):
+    """
+    Build the action line of a bulk index request. Versions before 7 need a mapping type.
+
+    :param index: Target index name.
+    :type index: str|unicode
+    :param major_version: Major Elasticsearch version.
+    :type major_version: int
+    :param doc_id: Document id, generated by Elasticsearch if None.
+    :type doc_id: str|unicode|None
+    :rtype : str|unicode
+    :return: The action as a JSON line, without newline.
+    """
+    action = {"_index": index}
+    if doc_id is not None:
+        action["_id"] = doc_id
+    if major_version < 7:
+        action["_type"] = "doc"
+
+    return json.dumps({"index": action})
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from shutil import rmtree
+
+from elasticsearch_runner.plugins import PLUGIN_CACHE_DIR
+from elasticsearch_runner.util import FileLock
+
+"""
+Size budgeted cleanup of the install path.
+
+The install path collects downloaded archives, extracted Elasticsearch homes and the transient directories
+of every cluster that was not cleaned up. The last use of every artifact is recorded in a small manifest, and
+gc() removes the least recently used ones until the install path fits its budget. Anything used by a live
+instance is never removed, including a node that is still starting and has not written its pid file yet.
+"""
+
+_logger = logging.getLogger(__name__)
+
+MANIFEST_FN = ".cache.json"
+LOCK_FN = ".cache.lock"
+LEASE_PREFIX = ".lease-"
+
+ES_HOME_PREFIX = "elasticsearch-"
+
+# tuple holding one evictable artifact of the install path, an Elasticsearch version or a cluster directory
+CacheEntry = namedtuple("CacheEntry", "name version paths size last_used in_use")
+
+
+def _files(path):
+    if not os.path.isdir(path) or os.path.islink(path):
+        return [path]
+
+    return [
+        os.path.join(root, fn) for root, dirs, files in os.walk(path) for fn in files
+    ]
+
+
+def path_size(path, seen=None):
+    """
+    :param path: Path to a file or directory.
+    :type path: str|unicode
+    :param seen: (device, inode) of files counted already, hard links to them are not counted again.
+    :type seen: set|None
+    :rtype : int
+    :return: Size in bytes of the file or of all files below the directory.
+    """
+    if seen is None:
+        seen = set()
+
+    size = 0
+    for fn in _files(path):
+        try:
+            st = os.lstat(fn)
+        except OSError:
+            continue
+
+        if (st.st_dev, st.st_ino) not in seen:
+            seen.add((st.st_dev, st.st_ino))
+            size += st.st_size
+
+    return size
+
+
+def freed_size(paths):
+    """
+    :param paths: Files or directories about to be removed.
+    :type paths: list[str|unicode]
+    :rtype : int
+    :return: Size in bytes freed by removing them. Files also hard linked from elsewhere stay on disk.
+    """
+    links = {}
+    for path in paths:
+        for fn in _files(path):
+            try:
+                st = os.lstat(fn)
+            except OSError:
+                continue
+
+            count, size, nlink = links.get(
+                (st.st_dev, st.st_ino), (0, st.st_size, st.st_nlink)
+            )
+            links[(st.st_dev, st.st_ino)] = (count + 1, size, nlink)
+
+    return sum(size for count, size, nlink in links.values() if count >= nlink)
+
+
+def _strip_archive_ext(fn):
+    for ext in (".zip", ".tar.gz"):
+        if fn.endswith(ext):
+            return fn[: -len(ext)]
+
+    return None
+
+
+class InstallCache:
+    """
+    Tracks the artifacts of an install path and evicts the least recently used ones.
+    """
+
+    def __init__(self, install_path, budget=None):
+        """
+        :param install_path: The install path of the runners, see ElasticsearchRunner.
+        :type install_path: str|unicode
+        :param budget: Max size in bytes of the install path used by gc().
+        :type budget: int|None
+        """
+        self.install_path = install_path
+        self.budget = budget
+        self._manifest_fn = os.path.join(install_path, MANIFEST_FN)
+        self._lock_fn = os.path.join(install_path, LOCK_FN)
+
+    def touch(self, *names):
+        """
+        Record the use of artifacts, f.ex "elasticsearch-6.6.0" or a cluster directory name.
+
+        :param names: Entry names relative to the install path.
+        """
+        if not os.path.exists(self.install_path):
+            os.makedirs(self.install_path, exist_ok=True)
+
+        with FileLock(self._lock_fn):
+            manifest = self._load()
+            now = time.time()
+            for name in names:
+                manifest[name] = now
+            self._save(manifest)
+
+    @contextmanager
+    def lease(self, name):
+        """
+        Mark a cluster directory as in use for the duration of a with block, f.ex while its node starts.
+        The lease is held by the current process, a lease of a process that is gone is ignored.
+
+        :param name: Cluster directory name relative to the install path.
+        :type name: str|unicode
+        """
+        path = os.path.join(self.install_path, name)
+        os.makedirs(path, exist_ok=True)
+
+        lease_fn = os.path.join(path, LEASE_PREFIX + uuid.uuid4().hex)
+        with open(lease_fn, "w") as f:
+            f.write(str(os.getpid()))
+        self.touch(name)
+
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lease_fn)
+            except OSError:
+                pass
+
+    def entries(self):
+        """
+        :rtype : list[CacheEntry]
+        :return: All artifacts of the install path, least recently used first.
+        """
+        from elasticsearch_runner.runner import fetch_pid_from_pid_file, process_exists
+
+        if not os.path.isdir(self.install_path):
+            return []
+
+        with FileLock(self._lock_fn):
+            manifest = self._load()
+
+        versions = {}
+        clusters = {}
+
+        for fn in os.listdir(self.install_path):
+            if fn.startswith("."):
+                continue
+
+            path = os.path.join(self.install_path, fn)
+
+            if fn.startswith(ES_HOME_PREFIX):
+                name = _strip_archive_ext(fn) if os.path.isfile(path) else fn
+                if name:
+                    versions.setdefault(name, []).append(path)
+            elif fn == PLUGIN_CACHE_DIR and os.path.isdir(path):
+                # downloaded plugin archives go with the plain home of their version
+                for version in os.listdir(path):
+                    versions.setdefault(ES_HOME_PREFIX + version, []).append(
+                        os.path.join(path, version)
+                    )
+            elif os.path.isdir(path) and "-" in fn:
+                clusters[fn] = path
+
+        live_versions = set()
+        entries = []
+        # homes with plugins hard link the files of the plain home, those are only counted once
+        seen = set()
+
+        for name, path in clusters.items():
+            pids = [fetch_pid_from_pid_file(os.path.join(path, ".pid"))]
+            try:
+                pids.extend(
+                    fetch_pid_from_pid_file(os.path.join(path, fn))
+                    for fn in os.listdir(path)
+                    if fn.startswith(LEASE_PREFIX)
+                )
+            except OSError:
+                pass
+            in_use = any(pid and process_exists(pid) for pid in pids)
+            version = name.split("-", 1)[0]
+            if in_use:
+                live_versions.add(version)
+
+            entries.append(
+                CacheEntry(
+                    name,
+                    version,
+                    [path],
+                    path_size(path, seen),
+                    self._last_used(manifest, name, [path]),
+                    in_use,
+                )
+            )
+
+        # plain homes first, so the homes with plugins only count what they add
+        for name, paths in sorted(versions.items(), key=lambda item: "+" in item[0]):
+            # homes with plugins are named like elasticsearch-6.6.0+plugins-1a2b3c4d
+            version = name[len(ES_HOME_PREFIX) :].split("+")[0]
+            entries.append(
+                CacheEntry(
+                    name,
+                    version,
+                    sorted(paths),
+                    sum(path_size(p, seen) for p in paths),
+                    self._last_used(manifest, name, paths),
+                    version in live_versions,
+                )
+            )
+
+        return sorted(entries, key=lambda e: e.last_used)
+
+    def gc(self, budget=None, keep=()):
+        """
+        Remove the least recently used artifacts until the install path fits the budget.
+
+        :param budget: Max size in bytes, defaults to the budget of the cache.
+        :type budget: int|None
+        :param keep: Entry names that must not be removed, f.ex the version just installed.
+        :type keep: list[str|unicode]
+        :rtype : list[CacheEntry]
+        :return: The removed entries.
+        """
+        if budget is None:
+            budget = self.budget
+        if budget is None:
+            return []
+
+        entries = self.entries()
+        total = sum(e.size for e in entries)
+        evicted = []
+
+        for entry in entries:
+            if total <= budget:
+                break
+
+            if entry.in_use or entry.name in keep or entry in evicted:
+                continue
+
+            # homes with plugins hard link the plain home of their version, so they are removed along with it
+            group = [entry] + [
+                e
+                for e in entries
+                if e.name.startswith(entry.name + "+") and e not in evicted
+            ]
+            if any(e.in_use or e.name in keep for e in group):
+                continue
+
+            paths = [p for e in group for p in e.paths]
+            freed = freed_size(paths)
+
+            _logger.info(
+                "Removing %s (%d MB) from the install path cache ..."
+                % (", ".join(e.name for e in group), freed // 1024**2)
+            )
+            for path in paths:
+                if os.path.isdir(path):
+                    rmtree(path, ignore_errors=True)
+                elif os.path.exists(path):
+                    os.remove(path)
+
+            total -= freed
+            evicted.extend(group)
+
+        if total > budget:
+            _logger.warning(
+                "Install path %s still uses %d MB after cleanup, over its budget of %d MB ..."
+                % (self.install_path, total // 1024**2, budget // 1024**2)
+            )
+
+        if evicted:
+            with FileLock(self._lock_fn):
+                manifest = self._load()
+                for entry in evicted:
+                    manifest.pop(entry.name, None)
+                self._save(manifest)
+
+        return evicted
+
+    @staticmethod
+    def _last_used(manifest, name, paths):
+        if name in manifest:
+            return manifest[name]
+
+        # not used through a runner since tracking started, fall back to the file times
+        return max(os.path.getmtime(p) for p in paths)
+
+    def _load(self):
+        try:
+            with open(self._manifest_fn) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _save(self, manifest):
+        tmp_fn = "%s.%d.tmp" % (self._manifest_fn, os.getpid())
+        with open(tmp_fn, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_fn, self._manifest_fn)
@@ -1,9 +1,7 @@
 import os
 
-import yaml
 
-
-def generate_config(cluster_name=None, log_path=None, data_path=None):
+def generate_config(cluster_name=None, log_path=None, data_path=None, http_port=None):
     """
     Generates basic Elasticsearch configuration for setting up the runner.
 
@@ -13,6 +11,8 @@ def generate_config(cluster_name=None, log_path=None, data_path=None):
     :type log_path: str|unicode
     :param data_path: Set as path.data option.
     :type data_path str|unicode
+    :param http_port: Set as http.port option.
+    :type http_port: int
     :rtype : dict
     :return: Elasticsearch configuration as dict.
     """
@@ -25,6 +25,9 @@ def generate_config(cluster_name=None, log_path=None, data_path=None):
         "http": {"cors": {"enabled": True, "allow-origin": "*"}}
     }
 
+    if http_port:
+        config["http"]["port"] = http_port
+
     if not cluster_name:
         cluster_name = generate_cluster_name()
 
@@ -68,11 +71,26 @@ def serialize_config(stream, config):
     :rtype : dict
     :return: The passed configuration dict.
     """
+    import yaml
+
     yaml.dump(config, stream=stream)
 
     return config
 
 
+def deserialize_config(stream):
+    """
+    Read an Elasticsearch configuration written by serialize_config.
+
+    :param stream: Stream to read YAML configuration from.
+    :rtype : dict
+    :return: Elasticsearch configuration as dict.
+    """
+    import yaml
+
+    return yaml.safe_load(stream) or {}
+
+
 def package_path():
     """
     Returns the path to the root of the package directory.
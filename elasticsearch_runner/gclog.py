@@ -0,0 +1,370 @@
+import glob
+import logging
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+from elasticsearch_runner.stats import percentile
+
+"""
+Streaming parser for the GC logs written by the bundled jvm.options, and a per-run pause summary.
+
+JDK 8 writes one bracketed event per collection, which spans several lines with the tenuring distribution or
+the G1 details enabled. JDK 9+ uses unified logging, where the line tagged plain "gc" sums up every pause.
+Both are parsed line by line into GCPause tuples, so logs of long runs are never held in memory.
+"""
+
+_logger = logging.getLogger(__name__)
+
+GC_LOG_FN = "gc.log"
+
+# metrics compared against a baseline by check_regression
+REGRESSION_METRICS = ("p99_pause", "max_pause")
+
+# tuple holding one stop-the-world GC pause, pause in seconds and heap sizes in bytes, None where not logged
+GCPause = namedtuple(
+    "GCPause", "timestamp uptime cause full pause heap_before heap_after heap_total"
+)
+
+# tuple holding the pauses of a run, pause times in seconds, allocation rate in bytes per second and heap in bytes
+GCSummary = namedtuple(
+    "GCSummary",
+    "pauses full_pauses total_pause max_pause p99_pause allocation_rate heap_after_gc_mean heap_after_gc_max",
+)
+
+_MAX_EVENT_LINES = 500
+
+_UNITS = {"B": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+_SIZE = r"[\d.]+[BKMG]"
+_DATE = r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d+[+-]\d{4}"
+
+# 2019-02-05T10:00:01.234+0100: 1.234: [GC (Allocation Failure) ...
+_JDK8_START = re.compile(r"^(?:(%s): )?(?:([\d.]+): )?(\[)(?:Full )?GC\b" % _DATE)
+_JDK8_PAUSE = re.compile(r",\s*([\d.]+) secs\s*$")
+_JDK8_CAUSE = re.compile(
+    r"^(?:Full )?GC\s*(.*?)\s*(?:,|%s|[\d.]+: |%s|$)" % (_DATE, _SIZE)
+)
+_JDK8_HEAP = re.compile(r"(?:(%s)->)?(%s)\((%s)\)" % (_SIZE, _SIZE, _SIZE))
+_G1_HEAP = re.compile(r"Heap: (%s)\(%s\)->(%s)\((%s)\)" % (_SIZE, _SIZE, _SIZE, _SIZE))
+
+# [2019-02-05T09:00:01.266+0000][12345][gc           ] GC(0) Pause Young (Allocation Failure) 266M->19M(990M) 32.456ms
+_UNIFIED_PAUSE = re.compile(
+    r"GC\(\d+\) Pause (.*?) (?:(%s)->)?(%s)\((%s)\) ([\d.]+)ms\s*$"
+    % (_SIZE, _SIZE, _SIZE)
+)
+_UNIFIED_DATE = re.compile(r"\[(%s)\]" % _DATE)
+_UNIFIED_UPTIME = re.compile(r"\[([\d.]+)s\]")
+
+
+def parse_size(size):
+    """
+    :param size: Size as written by the JVM, f.ex 272640K or 24.0M
+    :type size: str|unicode|None
+    :rtype : int|None
+    :return: Size in bytes.
+    """
+    if size is None:
+        return None
+
+    return int(float(size[:-1]) * _UNITS[size[-1]])
+
+
+def _parse_date(date):
+    if date is None:
+        return None
+
+    return datetime.strptime(date, "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+
+
+def _top_level(text, start):
+    # content of the bracket opened at start, without the nested brackets, None if it is not closed
+    depth = 0
+    chars = []
+    for c in text[start:]:
+        if c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+            if depth == 0:
+                return "".join(chars)
+        elif depth == 1:
+            chars.append(c)
+
+    return None
+
+
+def _jdk8_pause(lines):
+    m = _JDK8_START.match(lines[0])
+    text = "\n".join(lines)
+    top = _top_level(text, m.start(3))
+    if top is None:
+        return None
+
+    pause = _JDK8_PAUSE.search(top)
+    if not pause or "concurrent" in top:
+        # concurrent phase of G1, not a pause
+        return None
+
+    cause = _JDK8_CAUSE.match(top).group(1)
+    if re.match(r"^\([^()]*\)$", cause):
+        cause = cause[1:-1]
+
+    g1_heap = _G1_HEAP.search(text)
+    if g1_heap:
+        before, after, total = g1_heap.groups()
+    else:
+        heaps = _JDK8_HEAP.findall(top)
+        before, after, total = heaps[-1] if heaps else (None, None, None)
+
+    return GCPause(
+        timestamp=_parse_date(m.group(1)),
+        uptime=float(m.group(2)) if m.group(2) else None,
+        cause=cause,
+        full=top.startswith("Full GC"),
+        pause=float(pause.group(1)),
+        heap_before=parse_size(before or None),
+        heap_after=parse_size(after or None),
+        heap_total=parse_size(total or None),
+    )
+
+
+def _unified_pause(line, m):
+    prefix = line[: m.start()]
+    date = _UNIFIED_DATE.search(prefix)
+    uptime = _UNIFIED_UPTIME.search(prefix)
+    description, before, after, total, ms = m.groups()
+
+    return GCPause(
+        timestamp=_parse_date(date.group(1)) if date else None,
+        uptime=float(uptime.group(1)) if uptime else None,
+        cause=description,
+        full=description.startswith("Full"),
+        pause=float(ms) / 1000,
+        heap_before=parse_size(before),
+        heap_after=parse_size(after),
+        heap_total=parse_size(total),
+    )
+
+
+def parse_gc_log(lines):
+    """
+    Parse the pauses of a GC log, in JDK 8 or unified logging format.
+
+    :param lines: Lines of the log, f.ex an open file.
+    :type lines: collections.Iterable[str|unicode]
+    :rtype : collections.Iterator[GCPause]
+    :return: The pauses in log order.
+    """
+    event = []
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+
+        m = _UNIFIED_PAUSE.search(line)
+        if m:
+            yield _unified_pause(line, m)
+            continue
+
+        if _JDK8_START.match(line):
+            pause = _jdk8_pause(event) if event else None
+            if pause:
+                yield pause
+            event = [line]
+        elif event:
+            event.append(line)
+        else:
+            continue
+
+        # JDK 8 events end with the CPU times of the collection
+        if "[Times:" in line or len(event) > _MAX_EVENT_LINES:
+            pause = _jdk8_pause(event)
+            event = []
+            if pause:
+                yield pause
+
+    if event:
+        pause = _jdk8_pause(event)
+        if pause:
+            yield pause
+
+
+def summarize(pauses, since=None):
+    """
+    :param pauses: Pauses in log order.
+    :type pauses: collections.Iterable[GCPause]
+    :param since: Only count pauses from this epoch time on, f.ex the start of a run.
+    :type since: float|None
+    :rtype : GCSummary
+    :return: Pause count, total, max and p99 pause time, allocation rate and heap after GC.
+    """
+    durations = []
+    full_pauses = 0
+    heap_after_sum = heap_after_count = 0
+    heap_after_max = None
+    allocated = allocation_time = 0
+    previous = None
+
+    for pause in pauses:
+        if (
+            since is not None
+            and pause.timestamp is not None
+            and pause.timestamp < since
+        ):
+            continue
+
+        durations.append(pause.pause)
+        full_pauses += pause.full
+
+        if pause.heap_after is not None:
+            heap_after_sum += pause.heap_after
+            heap_after_count += 1
+            heap_after_max = max(heap_after_max or 0, pause.heap_after)
+
+        # what the heap grew by since the last pause was allocated in between
+        if (
+            previous
+            and previous.heap_after is not None
+            and pause.heap_before is not None
+        ):
+            if previous.uptime is not None and pause.uptime is not None:
+                elapsed = pause.uptime - previous.uptime
+            elif previous.timestamp is not None and pause.timestamp is not None:
+                elapsed = pause.timestamp - previous.timestamp
+            else:
+                elapsed = None
+
+            if elapsed is not None and elapsed > 0:
+                allocated += max(0, pause.heap_before - previous.heap_after)
+                allocation_time += elapsed
+
+        previous = pause
+
+    durations.sort()
+
+    return GCSummary(
+        pauses=len(durations),
+        full_pauses=full_pauses,
+        total_pause=sum(durations),
+        max_pause=durations[-1] if durations else None,
+        p99_pause=percentile(durations, 99),
+        allocation_rate=allocated / allocation_time if allocation_time else None,
+        heap_after_gc_mean=(
+            heap_after_sum // heap_after_count if heap_after_count else None
+        ),
+        heap_after_gc_max=heap_after_max,
+    )
+
+
+def gc_log_files(log_path):
+    """
+    :param log_path: Log directory of a node.
+    :type log_path: str|unicode
+    :rtype : list[str|unicode]
+    :return: The GC log and its rotated files, oldest first.
+    """
+    return sorted(
+        glob.glob(os.path.join(glob.escape(log_path), GC_LOG_FN + "*")),
+        key=os.path.getmtime,
+    )
+
+
+def _read_lines(fns):
+    for fn in fns:
+        with open(fn, errors="replace") as f:
+            for line in f:
+                yield line
+
+
+def analyze_gc_logs(fns, since=None):
+    """
+    :param fns: GC log files, oldest first.
+    :type fns: list[str|unicode]
+    :param since: Only count pauses from this epoch time on.
+    :type since: float|None
+    :rtype : GCSummary
+    """
+    return summarize(parse_gc_log(_read_lines(fns)), since)
+
+
+def set_gc_log_path(jvm_options_fn, gc_log_fn):
+    """
+    Point the GC logging options of a jvm.options file to gc_log_fn. The bundled options log relative to
+    the working directory of the JVM, which is shared by all nodes of a version.
+
+    :param jvm_options_fn: The jvm.options file to rewrite.
+    :type jvm_options_fn: str|unicode
+    :param gc_log_fn: Absolute path of the GC log.
+    :type gc_log_fn: str|unicode
+    :rtype : bool
+    :return: False if the options were left alone because gc_log_fn contains whitespace.
+    """
+    if re.search(r"\s", gc_log_fn):
+        # the start scripts pass the JVM options on unquoted, so the path would be split into several arguments
+        _logger.warning(
+            "GC log path %s contains whitespace, the GC log is written to the Elasticsearch home instead ..."
+            % gc_log_fn
+        )
+        return False
+
+    with open(jvm_options_fn) as f:
+        options = f.read()
+
+    options = re.sub(r"(-Xloggc:)\S+", lambda m: m.group(1) + gc_log_fn, options)
+    # unified logging separates options by colon, so the path is quoted for Windows drive letters
+    options = re.sub(
+        r"(-Xlog:\S*?file=)(\"[^\"]*\"|[^:\s]+)",
+        lambda m: '%s"%s"' % (m.group(1), gc_log_fn),
+        options,
+    )
+
+    with open(jvm_options_fn, "w") as f:
+        f.write(options)
+
+    return True
+
+
+class GCPauseRegression(Exception):
+    """
+    Raised when the GC pauses of a benchmark are worse than the baseline.
+    """
+
+    def __init__(self, regressions):
+        super().__init__("GC pauses regressed: %s" % "; ".join(regressions))
+        self.regressions = regressions
+
+
+def check_regression(summary, baseline, tolerance=0.25, metrics=REGRESSION_METRICS):
+    """
+    Compare the pauses of a run against a baseline, f.ex the GC summary of an earlier benchmark report.
+
+    :param summary: Summary of the run.
+    :type summary: GCSummary|dict
+    :param baseline: Summary to compare against, or limits like {"p99_pause": 0.05}. Missing metrics are skipped.
+    :type baseline: GCSummary|dict
+    :param tolerance: Allowed relative increase over the baseline.
+    :type tolerance: float
+    :param metrics: Summary fields to compare.
+    :type metrics: list[str|unicode]
+    :rtype : list[str|unicode]
+    :return: A description of every regressed metric, empty if there is none.
+    """
+    if isinstance(summary, GCSummary):
+        summary = summary._asdict()
+    if isinstance(baseline, GCSummary):
+        baseline = baseline._asdict()
+
+    regressions = []
+    for metric in metrics:
+        value = summary.get(metric)
+        limit = baseline.get(metric)
+        if value is None or limit is None:
+            continue
+
+        if value > limit * (1 + tolerance):
+            regressions.append(
+                "%s %.1f ms over baseline %.1f ms"
+                % (metric, value * 1000, limit * 1000)
+            )
+
+    return regressions
@@ -0,0 +1,186 @@
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from elasticsearch_runner.configuration import generate_cluster_name
+from elasticsearch_runner.runner import ElasticsearchRunner
+
+"""
+Runs a test callable or a pytest selection against several Elasticsearch versions side by side.
+
+All versions are installed into the same install path, so downloads are shared with every other runner,
+then one node per version is started on its own port and the tests run against all of them in parallel.
+The whole matrix takes about as long as the slowest version instead of the sum of all of them.
+"""
+
+_logger = logging.getLogger(__name__)
+
+# tuple holding the outcome of the tests against one Elasticsearch version, times are in seconds
+MatrixResult = namedtuple(
+    "MatrixResult", "version port passed result error install_time start_time run_time"
+)
+
+
+def free_port():
+    """
+    Ask the OS for a currently unused TCP port.
+
+    :rtype : int
+    :return: port number
+    """
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+    finally:
+        s.close()
+
+
+def pytest_test(pytest_args):
+    """
+    Build a test callable running pytest in a subprocess against a runner. The node is passed to pytest
+    with the ELASTICSEARCH_URL, ES_RUNNER_PORT and ES_RUNNER_VERSION environment variables.
+
+    :param pytest_args: Arguments for pytest, f.ex a test selection.
+    :type pytest_args: list[str|unicode]
+    :rtype : callable
+    :return: Callable returning the pytest exit code, raising an AssertionError if tests failed.
+    """
+
+    def run_pytest(runner):
+        env = dict(
+            os.environ,
+            ELASTICSEARCH_URL="http://localhost:%d" % runner.es_state.port,
+            ES_RUNNER_PORT=str(runner.es_state.port),
+            ES_RUNNER_VERSION=runner.version,
+        )
+        exit_code = subprocess.call(
+            [sys.executable, "-m", "pytest"] + list(pytest_args), env=env
+        )
+
+        if exit_code != 0:
+            raise AssertionError("pytest exited with code %d" % exit_code)
+
+        return exit_code
+
+    return run_pytest
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args), None, time.perf_counter() - start
+    except Exception:
+        return None, traceback.format_exc(), time.perf_counter() - start
+
+
+def run_matrix(versions, test, install_path=None, green_timeout=120.0, **runner_kwargs):
+    """
+    Install, start and test several Elasticsearch versions in parallel and stop them again.
+
+    :param versions: Elasticsearch versions to test, duplicates are ignored.
+    :type versions: list[str|unicode]
+    :param test: Callable receiving the running ElasticsearchRunner. It fails by raising an exception.
+    :type test: callable
+    :param install_path: Install path shared by all versions, see ElasticsearchRunner.
+    :type install_path: str|unicode|None
+    :param green_timeout: Seconds to wait for each node to turn green.
+    :type green_timeout: int|float
+    :param runner_kwargs: Extra ElasticsearchRunner arguments, f.ex admission=True on small hosts.
+    :rtype : dict[str|unicode, MatrixResult]
+    :return: The result for every version, in the order given.
+    """
+    versions = list(dict.fromkeys(versions))
+    runners = dict(
+        (
+            version,
+            ElasticsearchRunner(
+                install_path=install_path,
+                version=version,
+                http_port=free_port(),
+                # distinct names keep nodes on the same host from trying to join each other
+                cluster_name=generate_cluster_name(
+                    "elasticsearch_runner_%s" % version.replace(".", "_")
+                ),
+                **runner_kwargs
+            ),
+        )
+        for version in versions
+    )
+
+    def start(runner):
+        runner.run()
+        runner.wait_for_green(timeout=green_timeout)
+        if not runner.is_running():
+            raise RuntimeError(
+                "Elasticsearch %s failed to start:\n%s"
+                % (runner.version, "\n".join(runner.tail(20)))
+            )
+
+    def install_start_and_test(version):
+        runner = runners[version]
+        result = install_time = start_time = run_time = None
+
+        try:
+            _, error, install_time = _timed(runner.install)
+            if error is None:
+                _, error, start_time = _timed(start, runner)
+            if error is None:
+                _logger.info(
+                    "Running tests against Elasticsearch %s on port %d ..."
+                    % (version, runner.es_state.port)
+                )
+                result, error, run_time = _timed(test, runner)
+        finally:
+            runner.stop()
+
+        return MatrixResult(
+            version=version,
+            port=runner.http_port,
+            passed=error is None,
+            result=result,
+            error=error,
+            install_time=install_time,
+            start_time=start_time,
+            run_time=run_time,
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, len(versions))) as executor:
+        results = list(executor.map(install_start_and_test, versions))
+
+    return dict((r.version, r) for r in results)
+
+
+def format_results(results):
+    """
+    :param results: Results as returned by run_matrix.
+    :type results: dict[str|unicode, MatrixResult]
+    :rtype : str|unicode
+    :return: A plain text summary table.
+    """
+
+    def seconds(t):
+        return "-" if t is None else "%.1fs" % t
+
+    lines = [
+        "%-10s %-6s %9s %9s %9s" % ("version", "status", "install", "start", "run")
+    ]
+    for r in results.values():
+        lines.append(
+            "%-10s %-6s %9s %9s %9s"
+            % (
+                r.version,
+                "passed" if r.passed else "FAILED",
+                seconds(r.install_time),
+                seconds(r.start_time),
+                seconds(r.run_time),
+            )
+        )
+
+    return "\n".join(lines)
@@ -0,0 +1,181 @@
+import logging
+import os
+import threading
+from collections import deque
+
+"""
+Bounded capture of the output of an Elasticsearch process.
+
+The process writes into a pipe that a daemon thread keeps draining, so the JVM never blocks on a full
+pipe. Only the last lines are kept in memory, and they can optionally be spilled to a size capped,
+rotating file.
+"""
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_LINES = 1000
+DEFAULT_LOG_MAX_BYTES = 10 * 1024**2
+DEFAULT_LOG_BACKUP_COUNT = 2
+
+# longer lines, f.ex huge stack traces on a single line, are truncated in the buffer
+MAX_LINE_LENGTH = 16 * 1024
+
+_READ_SIZE = 64 * 1024
+
+
+class _RotatingFile:
+    """
+    Binary file that is rotated to fn.1, fn.2, ... when it grows past max_bytes.
+    """
+
+    def __init__(self, fn, max_bytes, backup_count):
+        self.fn = fn
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._f = open(fn, "ab")
+        self._size = self._f.tell()
+
+    def write(self, data):
+        while data:
+            if self._size >= self.max_bytes:
+                self._rotate()
+
+            part = data[: self.max_bytes - self._size]
+            self._f.write(part)
+            self._size += len(part)
+            data = data[len(part) :]
+
+        self._f.flush()
+
+    def _rotate(self):
+        self._f.close()
+
+        for i in range(self.backup_count - 1, 0, -1):
+            src = "%s.%d" % (self.fn, i)
+            if os.path.exists(src):
+                os.replace(src, "%s.%d" % (self.fn, i + 1))
+
+        if self.backup_count > 0:
+            os.replace(self.fn, "%s.1" % self.fn)
+        else:
+            os.remove(self.fn)
+
+        self._f = open(self.fn, "ab")
+        self._size = 0
+
+    def close(self):
+        self._f.close()
+
+
+class OutputBuffer:
+    """
+    Keeps the last lines written by a process to a pipe.
+    """
+
+    def __init__(
+        self,
+        max_lines=DEFAULT_BUFFER_LINES,
+        log_fn=None,
+        log_max_bytes=DEFAULT_LOG_MAX_BYTES,
+        log_backup_count=DEFAULT_LOG_BACKUP_COUNT,
+    ):
+        """
+        :param max_lines: Number of lines kept in memory.
+        :type max_lines: int
+        :param log_fn: Optional file the complete output is spilled to.
+        :type log_fn: str|unicode|None
+        :param log_max_bytes: Size at which the spill file is rotated.
+        :type log_max_bytes: int
+        :param log_backup_count: Number of rotated spill files kept.
+        :type log_backup_count: int
+        """
+        self.log_fn = log_fn
+        self.log_max_bytes = log_max_bytes
+        self.log_backup_count = log_backup_count
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def attach(self, pipe):
+        """
+        Start draining a pipe, f.ex the stdout of a Popen instance, in a daemon thread.
+
+        :param pipe: Binary file object to read from.
+        :rtype : OutputBuffer
+        :return: The instance called on.
+        """
+        self._thread = threading.Thread(
+            target=self._drain, args=(pipe,), name="elasticsearch-output", daemon=True
+        )
+        self._thread.start()
+
+        return self
+
+    def join(self, timeout=None):
+        """
+        Wait until the pipe is closed and all output is read.
+
+        :param timeout: Max seconds to wait.
+        :type timeout: int|float|None
+        """
+        if self._thread:
+            self._thread.join(timeout)
+
+    def tail(self, n=None):
+        """
+        :param n: Number of lines to return, all buffered lines if None.
+        :type n: int|None
+        :rtype : list[str|unicode]
+        :return: The last n lines of output.
+        """
+        with self._lock:
+            lines = list(self._lines)
+
+        return lines if n is None else lines[-n:] if n > 0 else []
+
+    def _append(self, raw_line):
+        line = raw_line[:MAX_LINE_LENGTH].decode("utf-8", "replace").rstrip("\r\n")
+
+        with self._lock:
+            self._lines.append(line)
+
+    def _drain(self, pipe):
+        spill = None
+        if self.log_fn:
+            try:
+                spill = _RotatingFile(
+                    self.log_fn, self.log_max_bytes, self.log_backup_count
+                )
+            except (IOError, OSError):
+                _logger.exception("Failed to open output file %s ..." % self.log_fn)
+
+        fd = pipe.fileno()
+        partial = b""
+
+        try:
+            while True:
+                # os.read returns whatever is available instead of waiting for a full chunk
+                chunk = os.read(fd, _READ_SIZE)
+                if not chunk:
+                    break
+
+                if spill:
+                    spill.write(chunk)
+
+                lines = (partial + chunk).split(b"\n")
+                partial = lines.pop()
+                for line in lines:
+                    self._append(line)
+
+                # a line without newline longer than the cap is cut here so memory stays bounded
+                if len(partial) > MAX_LINE_LENGTH:
+                    self._append(partial)
+                    partial = b""
+        except (IOError, OSError):
+            _logger.debug("Output pipe closed ...")
+        finally:
+            if partial:
+                self._append(partial)
+            if spill:
+                spill.close()
+            pipe.close()
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+Installation of Elasticsearch plugins into a home directory derived from a version's extracted home.
+
+The plain home of a version is shared by every runner of that version, so plugins are installed into a copy
+of it named after the version and the plugin set. Files of the copy are hard links where possible, so it is
+cheap to create. Plugin archives are kept in the download cache of the install path, installed concurrently,
+and recorded in a manifest in the derived home so that repeat installs skip them.
+"""
+
+_logger = logging.getLogger(__name__)
+
+PLUGIN_CACHE_DIR = "plugins"
+PLUGIN_MANIFEST_FN = ".plugins.json"
+
+ES_PLUGINS_URL_LOCATION = "https://artifacts.elastic.co/downloads/elasticsearch-plugins"
+ES2x_PLUGINS_URL_LOCATION = (
+    "https://download.elastic.co/elasticsearch/release/org/elasticsearch/plugin"
+)
+
+
+def plugins_home_folder(version_folder, plugins):
+    """
+    :param version_folder: Folder of the plain Elasticsearch home, f.ex elasticsearch-6.6.0
+    :type version_folder: str|unicode
+    :param plugins: Plugin names, urls or paths to plugin archives.
+    :type plugins: list[str|unicode]
+    :rtype : str|unicode
+    :return: Folder of the home with these plugins, f.ex elasticsearch-6.6.0+plugins-1a2b3c4d
+    """
+    if not plugins:
+        return version_folder
+
+    digest = hashlib.sha1("\n".join(sorted(set(plugins))).encode("utf-8")).hexdigest()
+
+    return "%s+plugins-%s" % (version_folder, digest[:8])
+
+
+def plugin_url(plugin, version):
+    """
+    Resolve a plugin to the location of its archive.
+
+    :param plugin: Name of an official plugin, f.ex analysis-icu, an url or a path to a plugin archive.
+    :type plugin: str|unicode
+    :param version: Elasticsearch version the plugin is for.
+    :type version: str|unicode
+    :rtype : str|unicode
+    :return: Url or local path of the plugin archive.
+    """
+    if "://" in plugin or os.path.exists(plugin):
+        return plugin
+
+    major = int(version.split(".")[0])
+
+    if major == 1:
+        raise ValueError(
+            "Official plugins can only be resolved by name for Elasticsearch 2 and later, "
+            "pass the url of %s instead" % plugin
+        )
+    if major == 2:
+        return "%s/%s/%s/%s-%s.zip" % (
+            ES2x_PLUGINS_URL_LOCATION,
+            plugin,
+            version,
+            plugin,
+            version,
+        )
+
+    return "%s/%s/%s-%s.zip" % (ES_PLUGINS_URL_LOCATION, plugin, plugin, version)
+
+
+def plugin_install_call(es_home, version, name, archive_fn, os_name):
+    """
+    :param es_home: Elasticsearch home to install into.
+    :type es_home: str|unicode
+    :param version: Elasticsearch version of the home.
+    :type version: str|unicode
+    :param name: Plugin name, only used by Elasticsearch 1.x.
+    :type name: str|unicode
+    :param archive_fn: Local path of the plugin archive.
+    :type archive_fn: str|unicode
+    :param os_name: OS identifier as returned by os.name
+    :type os_name: str|unicode
+    :rtype : list[str|unicode]
+    :return: The plugin installation command.
+    """
+    major = int(version.split(".")[0])
+    script = "elasticsearch-plugin" if major >= 5 else "plugin"
+    if os_name == "nt":
+        script += ".bat"
+
+    cmd = [os.path.join(es_home, "bin", script)]
+    if os_name != "nt":
+        cmd = ["/bin/sh"] + cmd
+
+    url = pathlib.Path(archive_fn).absolute().as_uri()
+
+    if major == 1:
+        return cmd + ["--url", url, "--install", name]
+
+    if major >= 5:
+        return cmd + ["install", "--batch", url]
+
+    return cmd + ["install", url]
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def derive_home(base_home, es_home):
+    """
+    Create es_home as a copy of base_home. Files are hard linked, except for the config directory which
+    runners and plugins write to.
+
+    :param base_home: The plain Elasticsearch home of a version.
+    :type base_home: str|unicode
+    :param es_home: The home to create.
+    :type es_home: str|unicode
+    """
+    tmp_home = "%s.%d.tmp" % (es_home, os.getpid())
+    if os.path.exists(tmp_home):
+        shutil.rmtree(tmp_home)
+
+    shutil.copytree(
+        base_home,
+        tmp_home,
+        symlinks=True,
+        copy_function=_link_or_copy,
+        ignore=lambda path, names: ["config"] if path == base_home else [],
+    )
+    shutil.copytree(os.path.join(base_home, "config"), os.path.join(tmp_home, "config"))
+
+    try:
+        os.rename(tmp_home, es_home)
+    except OSError:
+        # another process derived the same home in the meantime
+        shutil.rmtree(tmp_home, ignore_errors=True)
+
+
+def _plugin_name(plugin, version):
+    name = os.path.basename(plugin.rstrip("/"))
+    for suffix in (".zip", "-%s" % version):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+
+    return name
+
+
+def install_plugins(install_path, version, es_home, plugins, download):
+    """
+    Install plugins concurrently into an Elasticsearch home, skipping the ones already installed.
+
+    :param install_path: Install path, plugin archives are cached below it.
+    :type install_path: str|unicode
+    :param version: Elasticsearch version of the home.
+    :type version: str|unicode
+    :param es_home: Home to install into.
+    :type es_home: str|unicode
+    :param plugins: Plugin names, urls or paths to plugin archives.
+    :type plugins: list[str|unicode]
+    :param download: Function downloading an url to a directory and returning the local path, like download_file.
+    :type download: callable
+    :rtype : list[str|unicode]
+    :return: The plugins that were installed by this call.
+    """
+    manifest_fn = os.path.join(es_home, PLUGIN_MANIFEST_FN)
+    try:
+        with open(manifest_fn) as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        manifest = {}
+
+    missing = [p for p in dict.fromkeys(plugins) if p not in manifest]
+    if not missing:
+        return []
+
+    cache_path = os.path.join(install_path, PLUGIN_CACHE_DIR, version)
+
+    def install(plugin):
+        url = plugin_url(plugin, version)
+        archive_fn = url if os.path.exists(url) else download(url, cache_path)
+        name = _plugin_name(plugin, version)
+
+        _logger.info("Installing plugin %s into %s ..." % (name, es_home))
+        proc = subprocess.run(
+            plugin_install_call(es_home, version, name, archive_fn, os.name),
+            input=b"y\n",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(
+                "Failed to install plugin %s (exit code %d):\n%s"
+                % (plugin, proc.returncode, proc.stdout.decode("utf-8", "replace"))
+            )
+
+        return plugin, {"url": url, "installed": time.time()}
+
+    with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+        futures = [executor.submit(install, plugin) for plugin in missing]
+
+    installed = []
+    errors = []
+    for future in futures:
+        try:
+            installed.append(future.result())
+        except Exception as e:
+            errors.append(e)
+
+    # keep what did install, so a retry only installs the failed plugins
+    manifest.update(installed)
+    with open(manifest_fn, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if errors:
+        raise errors[0]
+
+    return [plugin for plugin, _ in installed]
@@ -7,30 +7,26 @@ import re
 import shutil
 import sys
 import glob
-import time
 from collections import namedtuple
 from shutil import copyfile, rmtree
-from subprocess import Popen
-from time import sleep, clock
+from subprocess import Popen, DEVNULL, PIPE, STDOUT
+from time import sleep, monotonic, time
 from typing import Optional
-from zipfile import ZipFile
-
-from tqdm import tqdm
 
 _logger = logging.getLogger(__name__)
 
 PY3 = sys.version_info > (3,)
 if PY3:
-    import urllib.request, urllib.parse, urllib.error
     import urllib.parse
 else:
     from urlparse import urlparse
 
-from psutil import Process, NoSuchProcess
-import requests
+# requests, tqdm, psutil, zipfile and the scheduler are imported where they are used, so that importing
+# the runner and checking the status of an instance stay cheap
 
 from elasticsearch_runner.configuration import (
     serialize_config,
+    deserialize_config,
     generate_config,
     generate_cluster_name,
     package_path,
@@ -91,8 +87,7 @@ def download_file(url, dest_path):
     :rtype : str|unicode
     :return: path to the downloaded file
     """
-    if not os.path.exists(dest_path):
-        os.makedirs(dest_path)
+    os.makedirs(dest_path, exist_ok=True)
 
     fn = fn_from_url(url)
     full_fn = os.path.join(dest_path, fn)
@@ -100,6 +95,9 @@ def download_file(url, dest_path):
     if os.path.exists(full_fn):
         _logger.info("Dataset archive %s already exists in %s ..." % (fn, dest_path))
     else:
+        import requests
+        from tqdm import tqdm
+
         _logger.info("Downloading files from {}".format(url))
         r = requests.get(url, stream=True)
         with open(full_fn, "wb") as f:
@@ -114,14 +112,29 @@ def download_file(url, dest_path):
     return full_fn
 
 
+_java_checks = {}
+
+
 def check_java():
     """
-    Simple check for Java availability on the local system.
+    Simple check for Java availability on the local system. The java executable is looked up in JAVA_HOME
+    and PATH, the result is cached for the current JAVA_HOME and PATH.
 
     :rtype : bool
     :return: True if Java available on the command line
     """
-    return os.system("java -version") == 0
+    fingerprint = (os.getenv("JAVA_HOME"), os.getenv("PATH"))
+
+    if fingerprint not in _java_checks:
+        java_home = os.getenv("JAVA_HOME")
+        java_bin = "java.exe" if os.name == "nt" else "java"
+
+        in_java_home = bool(java_home) and os.access(
+            os.path.join(java_home, "bin", java_bin), os.X_OK
+        )
+        _java_checks[fingerprint] = in_java_home or bool(shutil.which("java"))
+
+    return _java_checks[fingerprint]
 
 
 def process_exists(pid):
@@ -134,6 +147,8 @@ def process_exists(pid):
     :return: True if the process exists, False otherwise
     """
     if os.name == "nt":
+        from psutil import Process, NoSuchProcess
+
         # TODO something more solid on windows?
         try:
             return Process(pid).status() == "running"
@@ -201,6 +216,41 @@ ElasticsearchState = namedtuple(
 )
 
 
+class ElasticsearchStartError(Exception):
+    """
+    Raised when the Elasticsearch process exits while the runner waits for it to become ready.
+    """
+
+    def __init__(self, message, returncode=None, lines=None):
+        """
+        :param returncode: Exit code of the process, if known.
+        :type returncode: int|None
+        :param lines: Last lines of output or log of the process.
+        :type lines: list[str|unicode]
+        """
+        super().__init__(message)
+        self.returncode = returncode
+        self.lines = lines or []
+
+
+def tail_file(fn, n):
+    """
+    :param fn: Path of a text file.
+    :type fn: str|unicode
+    :param n: Number of lines to return.
+    :type n: int
+    :rtype : list[str|unicode]
+    :return: The last n lines of the file, empty if it can not be read.
+    """
+    from collections import deque
+
+    try:
+        with open(fn, errors="replace") as f:
+            return [line.rstrip("\r\n") for line in deque(f, maxlen=n)]
+    except (IOError, OSError):
+        return []
+
+
 def fetch_pid_from_pid_file(pid_path: str) -> Optional[int]:
     try:
         with open(pid_path) as pid_file:
@@ -214,7 +264,25 @@ class ElasticsearchRunner:
     Runs a basic single node Elasticsearch instance for testing or other lightweight purposes.
     """
 
-    def __init__(self, install_path=None, transient=False, version=None):
+    def __init__(
+        self,
+        install_path=None,
+        transient=False,
+        version=None,
+        admission=False,
+        admission_timeout=None,
+        capture_output=True,
+        output_lines=1000,
+        output_log_fn=None,
+        output_log_max_bytes=10 * 1024**2,
+        http_port=None,
+        cluster_name=None,
+        start_timeout=30.0,
+        on_exit=None,
+        cache_budget=None,
+        settings=None,
+        plugins=None,
+    ):
         """
         :param version: Elasticsearch version to run. Defaults to 2.1.0
         :type version: string
@@ -225,6 +293,38 @@ class ElasticsearchRunner:
         :type install_path: str|unicode
         :param transient: Not implemented.
         :type transient: bool
+        :param admission: Queue run() calls through the memory aware AdmissionScheduler shared by all runners
+        using the same install path, so parallel starts never reserve more heap than the host can hold.
+        An AdmissionScheduler instance may be passed to tune its headroom or memory budget.
+        :type admission: bool|AdmissionScheduler
+        :param admission_timeout: Max seconds run() waits for admission, None waits forever.
+        :type admission_timeout: int|float|None
+        :param capture_output: Capture stdout and stderr of the Elasticsearch process instead of letting it
+        write to the terminal. The last lines are available from tail().
+        :type capture_output: bool
+        :param output_lines: Number of captured output lines kept in memory.
+        :type output_lines: int
+        :param output_log_fn: Optional file the complete captured output is written to.
+        :type output_log_fn: str|unicode|None
+        :param output_log_max_bytes: Size at which output_log_fn is rotated, two rotated files are kept.
+        :type output_log_max_bytes: int
+        :param http_port: REST port of the instance. Defaults to 9200.
+        :type http_port: int|None
+        :param cluster_name: Name of the cluster, which also names its transient directories under the install path.
+        :type cluster_name: str|unicode|None
+        :param start_timeout: Max seconds run() waits for the server to write its pid file. run() fails right away
+        with an ElasticsearchStartError if the process exits before that.
+        :type start_timeout: int|float
+        :param on_exit: Called with the runner and the exit code when the node exits without stop() being called.
+        :type on_exit: callable|None
+        :param cache_budget: Max size in bytes of the install path. If set, install() removes the least recently
+        used versions and stale cluster directories that are not used by a live instance until it fits.
+        :type cache_budget: int|None
+        :param settings: Extra node settings written to elasticsearch.yml, f.ex {"thread_pool.search.size": 4}.
+        :type settings: dict|None
+        :param plugins: Plugins installed by install(), as names of official plugins (f.ex analysis-icu), urls or
+        paths to plugin archives. They go into a copy of the version's home shared by runners with the same plugins.
+        :type plugins: list[str|unicode]|None
         """
         if os.getenv("elasticsearch-runner-install-path"):
             install_path = os.getenv("elasticsearch-runner-install-path")
@@ -244,18 +344,50 @@ class ElasticsearchRunner:
             self.version = version
         else:
             self.version = ES_DEFAULT_VERSION
+        self.plugins = list(plugins or [])
         self.version_folder = "elasticsearch-%s" % self.version
+        if self.plugins:
+            from elasticsearch_runner.plugins import plugins_home_folder
+
+            self.version_folder = plugins_home_folder(self.version_folder, self.plugins)
         self.transient = transient
+        self.http_port = http_port
+        self.cluster_name = cluster_name or generate_cluster_name()
         self.es_state = None
         self.es_config = None
+        self.admission_timeout = admission_timeout
+        self.admission_ticket = None
+        self.capture_output = capture_output
+        self.output_lines = output_lines
+        self.output_log_fn = output_log_fn
+        self.output_log_max_bytes = output_log_max_bytes
+        self.output = None
+        self.warmup_report = None
+        self.benchmark_report = None
+        self.gc_report = None
+        self.start_timeout = start_timeout
+        self.on_exit = on_exit
+        self.cache_budget = cache_budget
+        self.settings = dict(settings or {})
+        self._process = None
+        self._watcher = None
+        self._log_fn = None
+        self._started_at = None
+
+        if admission is True:
+            from elasticsearch_runner.scheduler import AdmissionScheduler
+
+            self.admission = AdmissionScheduler(self.install_path)
+        else:
+            self.admission = admission or None
 
         if not check_java():
             _logger.error("Java not installed. Elasticsearch won't be able to run ...")
 
     def install(self):
         """
-        Download and install the Elasticsearch software in the install path. If already downloaded or installed
-        those steps are skipped.
+        Download and install the Elasticsearch software and plugins in the install path. If already downloaded
+        or installed those steps are skipped.
 
         :rtype : ElasticsearchRunner
         :return: The instance called on.
@@ -284,8 +416,11 @@ class ElasticsearchRunner:
 
         es_archive_fn = download_file(download_url, self.install_path)
 
-        es_home = os.path.join(self.install_path, self.version_folder)
+        base_folder = "elasticsearch-%s" % self.version
+        es_home = os.path.join(self.install_path, base_folder)
         if not os.path.exists(es_home):
+            from zipfile import ZipFile
+
             with ZipFile(es_archive_fn, "r") as z:
                 z.extractall(self.install_path)
 
@@ -305,6 +440,27 @@ class ElasticsearchRunner:
         for x_path_module in glob.glob(os.path.join(es_home, "modules", "x-pack*")):
             shutil.rmtree(x_path_module)
 
+        if self.plugins:
+            from elasticsearch_runner.plugins import derive_home, install_plugins
+
+            plugins_home = os.path.join(self.install_path, self.version_folder)
+            if not os.path.exists(plugins_home):
+                derive_home(es_home, plugins_home)
+
+            install_plugins(
+                self.install_path,
+                self.version,
+                plugins_home,
+                self.plugins,
+                download_file,
+            )
+
+        from elasticsearch_runner.cache import InstallCache
+
+        cache = InstallCache(self.install_path, self.cache_budget)
+        cache.touch(base_folder, self.version_folder)
+        cache.gc(keep=[base_folder, self.version_folder])
+
         return self
 
     def run(self):
@@ -314,15 +470,21 @@ class ElasticsearchRunner:
         :rtype : ElasticsearchRunner
         :return: The instance called on.
         """
-        if self.is_running():
+        if self.is_running() and self.es_state:
             _logger.warning("Elasticsearch already running ...")
             return self
 
+        # the watcher of an earlier process would fail the checks of this run
+        self._process = None
+        self._watcher = None
+
+        if self.is_running():
+            # started by another runner with the same install path, version and cluster name
+            return self.__attach(self.__pid_from_file())
+
         # generate and insert Elasticsearch configuration file with transient data and log paths
-        cluster_name = generate_cluster_name()
-        cluster_path = pathlib.Path(
-            os.path.join(self.install_path, "%s-%s" % (self.version, cluster_name))
-        )
+        cluster_name = self.cluster_name
+        cluster_path = pathlib.Path(self._cluster_path(cluster_name))
 
         es_data_dir = pathlib.Path(os.path.join(cluster_path, "data"))
         es_config_dir = pathlib.Path(os.path.join(cluster_path, "config"))
@@ -333,63 +495,236 @@ class ElasticsearchRunner:
             cluster_name=cluster_name,
             data_path=str(es_data_dir.absolute()),
             log_path=str(es_log_dir.absolute()),
+            http_port=self.http_port,
         )
+        self.es_config.update(self.settings)
         config_fn = os.path.join(es_config_dir, "elasticsearch.yml")
 
-        try:
-            cluster_path.mkdir(parents=True, exist_ok=True)
-            es_log_dir.mkdir(parents=True, exist_ok=True)
-            es_data_dir.mkdir(parents=True, exist_ok=True)
-            es_config_dir.mkdir(parents=True, exist_ok=True)
-        except OSError as exception:
-            if exception.errno != errno.EEXIST:
-                raise
-        with open(config_fn, "w") as f:
-            serialize_config(f, self.es_config)
-
-        for from_resource, to_resource in [
-            ("embedded_logging.yml", "logging.yml"),
-            ("jvm.options", "jvm.options"),
-            ("log4j.properties", "log4j2.properties"),
-        ]:
-            copyfile(
-                os.path.join(
-                    package_path(), "elasticsearch_runner", "resources", from_resource
-                ),
-                os.path.join(es_config_dir, to_resource),
+        from elasticsearch_runner.cache import InstallCache
+
+        # keeps install path cleanups of other runners away from the cluster until its pid file is written
+        with InstallCache(self.install_path).lease(cluster_path.name):
+            try:
+                cluster_path.mkdir(parents=True, exist_ok=True)
+                es_log_dir.mkdir(parents=True, exist_ok=True)
+                es_data_dir.mkdir(parents=True, exist_ok=True)
+                es_config_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as exception:
+                if exception.errno != errno.EEXIST:
+                    raise
+            with open(config_fn, "w") as f:
+                serialize_config(f, self.es_config)
+
+            for from_resource, to_resource in [
+                ("embedded_logging.yml", "logging.yml"),
+                ("jvm.options", "jvm.options"),
+                ("log4j.properties", "log4j2.properties"),
+            ]:
+                copyfile(
+                    os.path.join(
+                        package_path(),
+                        "elasticsearch_runner",
+                        "resources",
+                        from_resource,
+                    ),
+                    os.path.join(es_config_dir, to_resource),
+                )
+
+            from elasticsearch_runner.gclog import GC_LOG_FN, set_gc_log_path
+
+            set_gc_log_path(
+                os.path.join(es_config_dir, "jvm.options"),
+                str(es_log_dir.joinpath(GC_LOG_FN).absolute()),
             )
 
-        es_log_fn = os.path.join(es_log_dir, "%s.log" % cluster_name)
-        # create the log file if it doesn't exist yet. We need to open it and seek to to the end before
-        # sniffing out the configuration info from the log.
+            es_log_fn = os.path.join(es_log_dir, "%s.log" % cluster_name)
+            # create the log file if it doesn't exist yet. We need to open it and seek to to the end before
+            # sniffing out the configuration info from the log.
+
+            self._log_fn = es_log_fn
+
+            server_pid_from_file = fetch_pid_from_pid_file(pid_path)
+            if server_pid_from_file and not process_exists(server_pid_from_file):
+                _logger.warning(
+                    "Removing stale pid file %s of stopped process %d ..."
+                    % (pid_path, server_pid_from_file)
+                )
+                os.remove(pid_path)
+                server_pid_from_file = None
+
+            wrapper_pid = None
+            if not server_pid_from_file:
+
+                open(es_log_fn, "w").close()
+                runcall = self._es_wrapper_call(os.name)
+
+                mayor, _, _ = self.version.split(".")
+                if int(mayor) < 5:
+                    runcall.extend(
+                        [
+                            "-Des.path.conf=%s" % es_config_dir,
+                            "-Des.path.logs=%s" % es_log_dir,
+                        ]
+                    )
+
+                call_args = ["-p", pid_path]
+                runcall.extend(call_args)
+                env = {**os.environ, **dict(ES_PATH_CONF=es_config_dir)}
 
-        server_pid_from_file = fetch_pid_from_pid_file(pid_path)
-        if not server_pid_from_file:
+                if self.admission:
+                    from elasticsearch_runner.scheduler import (
+                        heap_size_from_jvm_options,
+                    )
 
-            open(es_log_fn, "w").close()
-            runcall = self._es_wrapper_call(os.name)
+                    self.admission_ticket = self.admission.acquire(
+                        heap_size_from_jvm_options(
+                            os.path.join(es_config_dir, "jvm.options"), env
+                        ),
+                        timeout=self.admission_timeout,
+                    )
 
-            mayor, _, _ = self.version.split(".")
-            if int(mayor) < 5:
-                runcall.extend(
-                    [
-                        "-Des.path.conf=%s" % es_config_dir,
-                        "-Des.path.logs=%s" % es_log_dir,
-                    ]
+                self._started_at = time()
+                try:
+                    if self.capture_output:
+                        from elasticsearch_runner.output import OutputBuffer
+
+                        self._process = Popen(
+                            runcall, env=env, stdin=DEVNULL, stdout=PIPE, stderr=STDOUT
+                        )
+                        self.output = OutputBuffer(
+                            max_lines=self.output_lines,
+                            log_fn=self.output_log_fn,
+                            log_max_bytes=self.output_log_max_bytes,
+                        ).attach(self._process.stdout)
+                    else:
+                        self._process = Popen(runcall, env=env)
+                except Exception:
+                    self.__release_admission()
+                    raise
+
+                from elasticsearch_runner.watcher import ProcessWatcher
+
+                wrapper_pid = self._process.pid
+                self._watcher = ProcessWatcher(self._process, on_exit=self.__on_exit)
+
+                try:
+                    server_pid_from_file = self.__wait_for_pid_file(pid_path)
+                except ElasticsearchStartError:
+                    self.__release_admission()
+                    raise
+
+                if server_pid_from_file:
+                    self._watcher.watch_server(server_pid_from_file)
+
+                if self.admission_ticket and server_pid_from_file:
+                    self.admission.attach(self.admission_ticket, server_pid_from_file)
+
+        self.es_state = ElasticsearchState(
+            wrapper_pid=wrapper_pid,
+            server_pid=server_pid_from_file,
+            port=self.http_port or 9200,
+            config_fn=config_fn,
+        )
+        return self
+
+    def __wait_for_pid_file(self, pid_path):
+        end_time = monotonic() + self.start_timeout
+
+        while True:
+            pid = fetch_pid_from_pid_file(pid_path)
+            if pid:
+                return pid
+
+            self.__check_alive()
+
+            if monotonic() > end_time:
+                _logger.warning(
+                    "Elasticsearch did not write its pid file in %f seconds ..."
+                    % self.start_timeout
                 )
+                return None
 
-            call_args = ["-p", pid_path]
-            runcall.extend(call_args)
-            Popen(runcall, env={**os.environ, **dict(ES_PATH_CONF=es_config_dir)})
-            time.sleep(3)
-            server_pid_from_file = fetch_pid_from_pid_file(pid_path)
+            self._watcher.wait(0.1)
+
+    def __check_alive(self):
+        """
+        Fail fast with the exit code and the last output lines if the started process is gone.
+        """
+        if self._watcher and self._watcher.exited.is_set():
+            if self.output:
+                # let the output thread read what the process wrote before it exited
+                self.output.join(1.0)
+
+            lines = self.tail(20) or tail_file(self._log_fn, 20)
+            raise ElasticsearchStartError(
+                "Elasticsearch process exited with code %s:\n%s"
+                % (self._watcher.returncode, "\n".join(lines)),
+                returncode=self._watcher.returncode,
+                lines=lines,
+            )
 
+    def __on_exit(self, returncode):
+        # the node is gone, give its memory to queued starts right away instead of at stop()
+        self.__release_admission()
+
+        if self.on_exit:
+            self.on_exit(self, returncode)
+
+    def tail(self, n=50):
+        """
+        Last lines of output written by the Elasticsearch process, kept after the process stopped until
+        the next run(). Empty if the output is not captured.
+
+        :param n: Number of lines to return.
+        :type n: int
+        :rtype : list[str|unicode]
+        :return: The last n lines of output, oldest first.
+        """
+        if self.output is None:
+            return []
+
+        return self.output.tail(n)
+
+    def __release_admission(self):
+        # also called from the watcher thread when the node exits
+        ticket, self.admission_ticket = self.admission_ticket, None
+        if self.admission and ticket:
+            self.admission.release(ticket)
+
+    def _cluster_path(self, cluster_name):
+        """
+        :param cluster_name: Name of the cluster run by this instance.
+        :type cluster_name: str|unicode
+        :rtype : str|unicode
+        :return: Path to the transient config, data and log directories of the cluster.
+        """
+        return os.path.join(self.install_path, "%s-%s" % (self.version, cluster_name))
+
+    def __attach(self, server_pid):
+        cluster_path = self._cluster_path(self.cluster_name)
+        config_fn = os.path.join(cluster_path, "config", "elasticsearch.yml")
+
+        try:
+            with open(config_fn) as f:
+                self.es_config = deserialize_config(f)
+        except (IOError, OSError):
+            self.es_config = generate_config(
+                cluster_name=self.cluster_name,
+                data_path=os.path.abspath(os.path.join(cluster_path, "data")),
+                log_path=os.path.abspath(os.path.join(cluster_path, "log")),
+                http_port=self.http_port,
+            )
+
+        _logger.info(
+            "Attaching to running Elasticsearch server process PID %d ..." % server_pid
+        )
         self.es_state = ElasticsearchState(
             wrapper_pid=None,
-            server_pid=server_pid_from_file,
-            port=9200,
+            server_pid=server_pid,
+            port=self.es_config.get("http", {}).get("port") or 9200,
             config_fn=config_fn,
         )
+
         return self
 
     @staticmethod
@@ -420,6 +755,112 @@ class ElasticsearchRunner:
 
         return es_bin
 
+    def restart(self):
+        """
+        Restart the Elasticsearch server with the current settings. The cluster path and data are kept, so
+        the node recovers its indices from its own data.
+
+        :rtype : ElasticsearchRunner
+        :return: The instance called on.
+        """
+        if self.is_running():
+            self.stop(delete_transient=False)
+
+        return self.run()
+
+    def update_settings(self, settings, index=None):
+        """
+        Change settings of the running node without losing its data. Cluster settings are applied through
+        _cluster/settings and index settings through the index settings API. Only settings that can not
+        be changed dynamically are written to the configuration and applied by a restart(), or for index
+        settings by closing and reopening the index.
+
+        :param settings: Settings to change, f.ex {"indices.recovery.max_bytes_per_sec": "100mb"}.
+        :type settings: dict
+        :param index: Index (or comma separated indices, or _all) the settings are index settings for. Index
+        settings need a running node, otherwise a RuntimeError is raised.
+        :type index: str|unicode|None
+        :rtype : ElasticsearchRunner
+        :return: The instance called on.
+        """
+        if not self.is_running():
+            if index is not None:
+                raise RuntimeError(
+                    "Elasticsearch is not running, settings of index %s can not be changed ..."
+                    % index
+                )
+
+            _logger.warning(
+                "Elasticsearch is not running, settings apply on the next run() ..."
+            )
+            self.settings.update(settings)
+            return self
+
+        import requests
+
+        base_url = "http://localhost:%d" % self.es_state.port
+
+        if index is not None:
+            index_url = "%s/%s/_settings" % (base_url, index)
+            resp = requests.put(index_url, json={"index": settings})
+
+            if not resp.ok and self.__is_static_setting_error(resp):
+                _logger.info(
+                    "Closing index %s to apply static settings %s ..."
+                    % (index, ", ".join(sorted(settings)))
+                )
+                requests.post("%s/%s/_close" % (base_url, index)).raise_for_status()
+                try:
+                    resp = requests.put(index_url, json={"index": settings})
+                finally:
+                    requests.post("%s/%s/_open" % (base_url, index)).raise_for_status()
+
+            resp.raise_for_status()
+            return self
+
+        static = {}
+        mayor = int(self.version.split(".")[0])
+        for key, value in settings.items():
+            # one key at a time, the API rejects the whole request if any key is static
+            resp = requests.put(
+                "%s/_cluster/settings" % base_url, json={"persistent": {key: value}}
+            )
+
+            if resp.ok:
+                # before 5.0 static keys are silently left out of the response instead of failing,
+                # later versions also answer a reset with None that way
+                if (
+                    mayor < 5
+                    and value is not None
+                    and not resp.json().get("persistent")
+                ):
+                    static[key] = value
+                continue
+
+            if self.__is_static_setting_error(resp):
+                static[key] = value
+            else:
+                resp.raise_for_status()
+
+        if static:
+            _logger.info(
+                "Restarting Elasticsearch to apply static settings %s ..."
+                % ", ".join(sorted(static))
+            )
+            self.settings.update(static)
+            self.restart()
+
+        return self
+
+    @staticmethod
+    def __is_static_setting_error(resp):
+        text = resp.text.lower()
+        return resp.status_code == 400 and (
+            "not dynamically updat" in text
+            or "non dynamic" in text
+            or "non-dynamic" in text
+        )
+
     def stop(self, delete_transient: bool = True):
         """
         Stop the Elasticsearch server.
@@ -429,22 +870,38 @@ class ElasticsearchRunner:
         """
 
         if self.is_running():
+            from psutil import Process
+
             pid = self.__es_pid()
 
-            server_proc = Process(pid)
-            server_proc.terminate()
-            server_proc.wait()
+            if self._watcher:
+                self._watcher.expect_exit()
+
+            if self._watcher and self._watcher.pid == pid:
+                # our own child, terminate and let the watcher reap it
+                self._process.terminate()
+                self._watcher.wait()
+            else:
+                server_proc = Process(pid)
+                server_proc.terminate()
+                server_proc.wait()
 
             if process_exists(pid):
                 _logger.warning(
                     "Failed to stop Elasticsearch server process PID %d ..." % pid
                 )
 
+            # summarize the GC log before the log path is removed
+            try:
+                self.analyze_gc()
+            except Exception:
+                _logger.exception("Failed to analyze the GC log ...")
+
             # delete transient directories
             if delete_transient:
-                if "path" in self.es_config:
-                    if "log" in self.es_config["path"]:
-                        log_path = self.es_config["path"]["log"]
+                if self.es_config and "path" in self.es_config:
+                    if "logs" in self.es_config["path"]:
+                        log_path = self.es_config["path"]["logs"]
                         _logger.info("Removing transient log path %s ..." % log_path)
                         rmtree(log_path)
 
@@ -454,7 +911,7 @@ class ElasticsearchRunner:
                         rmtree(data_path)
 
                 # delete temporary config file
-                if os.path.exists(self.es_state.config_fn):
+                if self.es_state and os.path.exists(self.es_state.config_fn):
                     _logger.info(
                         "Removing transient configuration file %s ..."
                         % self.es_state.config_fn
@@ -463,11 +920,15 @@ class ElasticsearchRunner:
 
             self.es_state = None
             self.es_config = None
+            self._process = None
+            self._watcher = None
         else:
             _logger.warning("Elasticsearch is not running ...")
             self.es_state = None
             self.es_config = None
 
+        self.__release_admission()
+
         return self
 
     def is_running(self):
@@ -489,7 +950,7 @@ class ElasticsearchRunner:
 
     def __pid_from_file(self) -> Optional[int]:
         try:
-            cluster_path = generate_cluster_name()
+            cluster_path = self._cluster_path(self.cluster_name)
             pid_path = self.__get_pid_file(cluster_path)
             pid = fetch_pid_from_pid_file(pid_path)
             return pid
@@ -513,30 +974,139 @@ class ElasticsearchRunner:
         if self.es_state.port is None:
             _logger.warning("Elasticsearch runner not properly started ...")
             return self
-        end_time = clock() + timeout
-        health_resp = requests.get(
-            "http://localhost:%d/_cluster/health" % self.es_state.port
-        )
-        health_data = json.loads(health_resp.text)
+        end_time = monotonic() + timeout
+        self.__check_alive()
+        status = self.__health_status()
+
+        while status != "green":
+            self.__check_alive()
 
-        while health_data["status"] != "green":
-            if clock() > end_time:
+            if monotonic() > end_time:
                 _logger.error(
                     "Elasticsearch cluster failed to turn green in %f seconds, current status is %s ..."
-                    % (timeout, health_data["status"])
+                    % (timeout, status)
                 )
 
                 return self
 
+            sleep(0.1)
+            status = self.__health_status()
+
+        return self
+
+    def warm_up(self, **kwargs):
+        """
+        Warm up the JVM of a green node by running a small index, search and aggregation workload against
+        a scratch index until the latency levels off, so the first tests do not pay for a cold JVM.
+        The report is stored in the warmup_report field.
+
+        :param kwargs: Workload options, see elasticsearch_runner.warmup.warm_up.
+        :rtype : ElasticsearchRunner
+        :return: The instance called on.
+        """
+        if not self.es_state:
+            _logger.warning("Elasticsearch runner is not started ...")
+            return self
+
+        from elasticsearch_runner.warmup import warm_up
+
+        self.warmup_report = warm_up(self.es_state.port, self.version, **kwargs)
+
+        return self
+
+    def benchmark(self, workload, gc_baseline=None, gc_tolerance=0.25):
+        """
+        Replay a workload spec of bulk indexing and query templates against the node with concurrent workers.
+        The report with throughput, latency percentiles and error rates is stored in the benchmark_report field,
+        with the GC pauses during the benchmark under "gc".
+
+        :param workload: Workload spec as dict, or the path to a JSON file with it. See
+        elasticsearch_runner.benchmark for the format.
+        :type workload: dict|str|unicode
+        :param gc_baseline: GC summary of an earlier benchmark report, or limits like {"p99_pause": 0.05}.
+        Raises GCPauseRegression if the pauses are worse.
+        :type gc_baseline: dict|elasticsearch_runner.gclog.GCSummary|None
+        :param gc_tolerance: Allowed relative increase of the pause times over gc_baseline.
+        :type gc_tolerance: float
+        :rtype : ElasticsearchRunner
+        :return: The instance called on.
+        """
+        if not self.es_state:
+            _logger.warning("Elasticsearch runner is not started ...")
+            return self
+
+        from elasticsearch_runner.benchmark import run_benchmark
+        from elasticsearch_runner.gclog import (
+            GCPauseRegression,
+            analyze_gc_logs,
+            check_regression,
+            gc_log_files,
+        )
+
+        started_at = time()
+        self.benchmark_report = run_benchmark(
+            self.es_state.port, self.version, workload
+        )
+
+        gc_fns = gc_log_files(self._log_path())
+        if not gc_fns:
+            if gc_baseline is not None:
+                _logger.warning(
+                    "No GC log found in %s, skipping the GC pause check ..."
+                    % self._log_path()
+                )
+            return self
+
+        gc_summary = analyze_gc_logs(gc_fns, since=started_at)
+        self.benchmark_report["gc"] = gc_summary._asdict()
+
+        if gc_baseline is not None:
+            regressions = check_regression(gc_summary, gc_baseline, gc_tolerance)
+            if regressions:
+                raise GCPauseRegression(regressions)
+
+        return self
+
+    def analyze_gc(self):
+        """
+        Summarize the GC pauses of the current run from the GC log of the node: pause count, total, max and p99
+        pause time, allocation rate and heap after GC. stop() calls it before removing the log path. The summary
+        is stored in the gc_report field.
+
+        :rtype : ElasticsearchRunner
+        :return: The instance called on.
+        """
+        from elasticsearch_runner.gclog import analyze_gc_logs, gc_log_files
+
+        gc_fns = gc_log_files(self._log_path())
+        if not gc_fns:
+            _logger.info("No GC log found in %s ..." % self._log_path())
+            return self
+
+        self.gc_report = analyze_gc_logs(gc_fns, since=self._started_at)
+
+        return self
+
+    def _log_path(self):
+        return os.path.join(self._cluster_path(self.cluster_name), "log")
+
+    def __health_status(self):
+        import requests
+
+        try:
             health_resp = requests.get(
                 "http://localhost:%d/_cluster/health" % self.es_state.port
             )
-            health_data = json.loads(health_resp.text)
+        except requests.ConnectionError:
+            # the node is still booting and not listening yet
+            return None
 
-        return self
+        return json.loads(health_resp.text)["status"]
 
     def wait_process(self, timeout: Optional[int] = None):
         if self.is_running():
+            from psutil import Process
+
             pid = self.__es_pid()
             process = Process(pid)
             process.wait(timeout=timeout)
@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from collections import namedtuple
+
+from elasticsearch_runner.util import FileLock
+
+"""
+Memory aware admission control for Elasticsearch instances started on the same host.
+
+Every node reserves its full heap up front (-Xms == -Xmx and AlwaysPreTouch), so starting too many
+nodes in parallel makes the host swap or triggers the OOM killer. The scheduler keeps a small state
+file under the install path, guarded by a lock file, so that runners in different processes agree on
+how many nodes fit in memory and start in FIFO order.
+"""
+
+_logger = logging.getLogger(__name__)
+
+LOCK_FN = ".admission.lock"
+STATE_FN = ".admission.json"
+
+DEFAULT_HEAP_SIZE = 1024**3
+DEFAULT_HEADROOM = 512 * 1024**2
+
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+# tuple holding information about an admitted start request
+AdmissionTicket = namedtuple("AdmissionTicket", "ticket_id heap_size waited")
+
+
+class AdmissionTimeout(Exception):
+    """
+    Raised when a start request is not admitted within its timeout.
+    """
+
+
+def parse_heap_size(value):
+    """
+    Parse a JVM memory size such as 512m or 1g into bytes.
+
+    :param value: JVM size string, without the -Xmx prefix
+    :type value: str|unicode
+    :rtype : int
+    :return: size in bytes
+    """
+    m = re.match(r"^\s*(\d+)([kmgt]?)\s*$", value.lower())
+    if not m:
+        raise ValueError("Invalid JVM memory size %r" % value)
+
+    return int(m.group(1)) * _SIZE_UNITS[m.group(2)]
+
+
+def heap_size_from_jvm_options(jvm_options_fn, env=None):
+    """
+    Find the max heap size a node will reserve. The -Xmx option in jvm.options is used unless
+    it is overridden by the ES_JAVA_OPTS environment variable.
+
+    :param jvm_options_fn: path to the jvm.options file used by the node
+    :type jvm_options_fn: str|unicode
+    :param env: environment the node is started with, defaults to os.environ
+    :type env: dict
+    :rtype : int
+    :return: heap size in bytes
+    """
+    if env is None:
+        env = os.environ
+
+    heap_size = DEFAULT_HEAP_SIZE
+
+    if os.path.exists(jvm_options_fn):
+        with open(jvm_options_fn) as f:
+            for line in f:
+                # version specific options like "8:-Xmx1g" apply to any JDK we may run on
+                m = re.match(r"^\s*(?:[\d-]+:)?-Xmx(\S+)\s*$", line)
+                if m:
+                    heap_size = parse_heap_size(m.group(1))
+
+    for m in re.finditer(r"-Xmx(\S+)", env.get("ES_JAVA_OPTS", "")):
+        heap_size = parse_heap_size(m.group(1))
+
+    return heap_size
+
+
+def system_memory():
+    """
+    Total and currently available physical memory of the host.
+
+    :rtype : (int, int)
+    :return: A tuple with the total and available memory in bytes, ie. (total, available)
+    """
+    from psutil import virtual_memory
+
+    memory = virtual_memory()
+    return memory.total, memory.available
+
+
+class AdmissionScheduler:
+    """
+    Cross process admission scheduler deciding how many Elasticsearch nodes may run at once given
+    the free memory of the host and the heap size of each node.
+    """
+
+    def __init__(
+        self,
+        path,
+        headroom=DEFAULT_HEADROOM,
+        memory_budget=None,
+        poll_interval=0.5,
+        memory_probe=None,
+    ):
+        """
+        :param path: Directory shared by all cooperating runners, usually the install path.
+        :type path: str|unicode
+        :param headroom: Memory in bytes that is left for the OS and the test processes.
+        :type headroom: int
+        :param memory_budget: Fixed memory in bytes for all node heaps. If set, free memory is not probed.
+        :type memory_budget: int|None
+        :param poll_interval: Seconds between admission attempts while queued.
+        :type poll_interval: float
+        :param memory_probe: Callable returning (total, available) memory in bytes. Defaults to system_memory.
+        :type memory_probe: callable
+        """
+        self.path = path
+        self.headroom = headroom
+        self.memory_budget = memory_budget
+        self.poll_interval = poll_interval
+        self.memory_probe = memory_probe or system_memory
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self._lock_fn = os.path.join(path, LOCK_FN)
+        self._state_fn = os.path.join(path, STATE_FN)
+
+    def acquire(self, heap_size, timeout=None):
+        """
+        Wait until a node with the given heap size fits in memory and all earlier requests are admitted.
+
+        :param heap_size: Heap size of the node in bytes.
+        :type heap_size: int
+        :param timeout: Max seconds to wait in the queue, None waits forever.
+        :type timeout: int|float|None
+        :rtype : AdmissionTicket
+        :return: The ticket to pass to attach() and release().
+        """
+        ticket_id = uuid.uuid4().hex
+        start = time.time()
+
+        request = {
+            "id": ticket_id,
+            "pid": os.getpid(),
+            "heap": heap_size,
+            "since": start,
+        }
+
+        with FileLock(self._lock_fn):
+            state = self._load()
+            state["queue"].append(request)
+            self._save(state)
+
+        while True:
+            with FileLock(self._lock_fn):
+                state = self._prune(self._load())
+
+                if ticket_id not in [q["id"] for q in state["queue"]]:
+                    # the state file was removed or reset while queued, line up again in arrival order
+                    state["queue"].append(request)
+                    state["queue"].sort(key=lambda q: q["since"])
+                    self._save(state)
+
+                if state["queue"][0]["id"] == ticket_id and self._fits(
+                    state, heap_size
+                ):
+                    entry = state["queue"].pop(0)
+                    entry["node_pid"] = None
+                    state["holders"].append(entry)
+                    self._save(state)
+
+                    waited = time.time() - start
+                    _logger.info(
+                        "Admitted Elasticsearch start with %d MB heap after waiting %.2f seconds ..."
+                        % (heap_size // 1024**2, waited)
+                    )
+
+                    return AdmissionTicket(ticket_id, heap_size, waited)
+
+                if timeout is not None and time.time() - start > timeout:
+                    queued_ids = [q["id"] for q in state["queue"]]
+                    ahead = queued_ids.index(ticket_id)
+                    state["queue"].pop(ahead)
+                    self._save(state)
+
+                    raise AdmissionTimeout(
+                        "Elasticsearch start with %d MB heap not admitted within %s seconds, "
+                        "%d nodes running and %d requests queued ahead ..."
+                        % (heap_size // 1024**2, timeout, len(state["holders"]), ahead)
+                    )
+
+            time.sleep(self.poll_interval)
+
+    def attach(self, ticket, node_pid):
+        """
+        Bind an admitted ticket to the server process, so the reservation is kept for as long as
+        the node lives even if the process that started it exits.
+
+        :param ticket: Ticket returned by acquire().
+        :type ticket: AdmissionTicket
+        :param node_pid: PID of the Elasticsearch server process.
+        :type node_pid: int
+        """
+        with FileLock(self._lock_fn):
+            state = self._load()
+            for holder in state["holders"]:
+                if holder["id"] == ticket.ticket_id:
+                    holder["node_pid"] = node_pid
+            self._save(state)
+
+    def release(self, ticket):
+        """
+        Give back the memory reserved by a ticket.
+
+        :param ticket: Ticket returned by acquire().
+        :type ticket: AdmissionTicket
+        """
+        with FileLock(self._lock_fn):
+            state = self._load()
+            state["holders"] = [
+                h for h in state["holders"] if h["id"] != ticket.ticket_id
+            ]
+            self._save(state)
+
+    def capacity(self, heap_size):
+        """
+        Number of additional nodes with the given heap size that fit in memory right now.
+
+        :param heap_size: Heap size of a node in bytes.
+        :type heap_size: int
+        :rtype : int
+        """
+        with FileLock(self._lock_fn):
+            state = self._prune(self._load())
+
+        return max(0, self._free(state) // heap_size)
+
+    def _free(self, state):
+        reserved = sum(h["heap"] for h in state["holders"])
+
+        if self.memory_budget is not None:
+            return self.memory_budget - reserved
+
+        total, available = self.memory_probe()
+
+        # nodes admitted a moment ago may not have touched their heap yet, so bound the
+        # reservations by the total memory as well as by what is actually free
+        return min(total - self.headroom - reserved, available - self.headroom)
+
+    def _fits(self, state, heap_size):
+        if self._free(state) >= heap_size:
+            return True
+
+        if not state["holders"]:
+            _logger.warning(
+                "Not enough memory for a %d MB heap, but no other node is running. Starting anyway ..."
+                % (heap_size // 1024**2)
+            )
+            return True
+
+        return False
+
+    def _prune(self, state):
+        from elasticsearch_runner.runner import process_exists
+
+        state["holders"] = [
+            h
+            for h in state["holders"]
+            if process_exists(h["pid"])
+            or (h.get("node_pid") and process_exists(h["node_pid"]))
+        ]
+        state["queue"] = [q for q in state["queue"] if process_exists(q["pid"])]
+
+        return state
+
+    def _load(self):
+        try:
+            with open(self._state_fn) as f:
+                state = json.load(f)
+        except (IOError, OSError, ValueError):
+            state = {}
+
+        state.setdefault("holders", [])
+        state.setdefault("queue", [])
+
+        return state
+
+    def _save(self, state):
+        tmp_fn = "%s.%d.tmp" % (self._state_fn, os.getpid())
+        with open(tmp_fn, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_fn, self._state_fn)
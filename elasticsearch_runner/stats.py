@@ -0,0 +1,23 @@
+import math
+
+"""
+Small statistics helpers shared by the benchmark and GC reports.
+"""
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest rank percentile.
+
+    :param sorted_values: Values in ascending order.
+    :type sorted_values: list[float]
+    :param p: Percentile between 0 and 100.
+    :type p: int|float
+    :rtype : float|None
+    :return: The percentile, None if there are no values.
+    """
+    if not sorted_values:
+        return None
+
+    rank = max(1, math.ceil(round(p * len(sorted_values) / 100.0, 9)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
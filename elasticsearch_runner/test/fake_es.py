@@ -0,0 +1,47 @@
+import os
+import stat
+import tempfile
+import unittest
+from shutil import rmtree
+from unittest import TestCase
+
+# writes its pid to the file passed with -p and keeps running
+RUNNING_SCRIPT = 'echo $$ > "$2"\nexec sleep 60\n'
+
+
+@unittest.skipIf(os.name == "nt", "uses a shell script as fake Elasticsearch")
+class FakeElasticsearchTestCase(TestCase):
+    """
+    Installs a shell script as bin/elasticsearch of every version in versions into a temporary install
+    path for every test, the install path is in self.install_path. The versions come with an empty archive,
+    so install() does not download them.
+    """
+
+    versions = ["6.6.0"]
+    script = RUNNING_SCRIPT
+
+    def setUp(self):
+        self.install_path = tempfile.mkdtemp()
+        for version in self.versions:
+            self.write_script(self.script, version)
+
+    def tearDown(self):
+        rmtree(self.install_path)
+
+    def write_script(self, script, version="6.6.0"):
+        """
+        :param script: Shell script run instead of Elasticsearch, with -p <pid file> as arguments.
+        :type script: str|unicode
+        :param version: Version whose bin/elasticsearch is written.
+        :type version: str|unicode
+        """
+        es_home = os.path.join(self.install_path, "elasticsearch-%s" % version)
+        bin_path = os.path.join(es_home, "bin")
+        os.makedirs(bin_path, exist_ok=True)
+        os.makedirs(os.path.join(es_home, "config"), exist_ok=True)
+        open(es_home + ".zip", "a").close()
+
+        es_bin = os.path.join(bin_path, "elasticsearch")
+        with open(es_bin, "w") as f:
+            f.write(script)
+        os.chmod(es_bin, os.stat(es_bin).st_mode | stat.S_IEXEC)
@@ -0,0 +1,66 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import TestCase
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubElasticsearch(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the Elasticsearch REST API. Records every request as (method, path, body) and
+    answers it with the JSON returned by respond(), which subclasses override.
+    """
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+    lock = threading.Lock()
+
+    def respond(self, body):
+        """
+        :param body: Raw request body.
+        :type body: bytes
+        :rtype : (int, dict)
+        :return: Status code and JSON payload of the response.
+        """
+        return 200, {"acknowledged": True}
+
+    def _handle(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        with self.lock:
+            self.requests.append((self.command, self.path, body))
+            status, payload = self.respond(body)
+
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_PUT = do_POST = do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerTestCase(TestCase):
+    """
+    Serves handler on a free local port for every test, the port is in self.port.
+    """
+
+    handler = StubElasticsearch
+
+    def setUp(self):
+        self.handler.requests = []
+        self.server = ThreadingHTTPServer(("localhost", 0), self.handler)
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
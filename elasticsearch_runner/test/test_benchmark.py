@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import tempfile
+from shutil import rmtree
+
+from elasticsearch_runner.benchmark import render, run_benchmark
+from elasticsearch_runner.stats import percentile
+from elasticsearch_runner.test.stub_server import StubElasticsearch, StubServerTestCase
+
+
+class BenchmarkStub(StubElasticsearch):
+    def respond(self, body):
+        if self.path.endswith("/_bulk"):
+            return 200, {"errors": False, "items": []}
+
+        if self.path.endswith("/_search"):
+            if json.loads(body.decode())["query"]["match"]["title"] == "fail":
+                return 500, {"error": "failed"}
+
+        return 200, {"acknowledged": True}
+
+
+class TestBenchmark(StubServerTestCase):
+    handler = BenchmarkStub
+
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super().tearDown()
+        rmtree(self.path)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_render(self):
+        rnd = random.Random(1)
+        self.assertEqual(
+            render(
+                {"size": "{{size}}", "q": ["title:{{term}}"]},
+                {"size": [10], "term": ["x"]},
+                rnd,
+            ),
+            {"size": 10, "q": ["title:x"]},
+        )
+
+    def test_run_benchmark(self):
+        docs_fn = os.path.join(self.path, "docs.ndjson")
+        with open(docs_fn, "w") as f:
+            for i in range(25):
+                f.write(json.dumps({"title": "doc %d" % i}) + "\n")
+
+        workload_fn = os.path.join(self.path, "workload.json")
+        with open(workload_fn, "w") as f:
+            json.dump(
+                {
+                    "index": "bench",
+                    "bulk": {"file": "docs.ndjson", "batch_size": 10},
+                    "queries": [
+                        {
+                            "name": "match",
+                            "body": {"query": {"match": {"title": "{{term}}"}}},
+                            "params": {"term": ["doc", "fail"]},
+                        }
+                    ],
+                    "concurrency": 3,
+                    "duration": 0.3,
+                },
+                f,
+            )
+
+        report = run_benchmark(self.port, "6.6.0", workload_fn)
+        json.dumps(report)
+
+        bulk_lines = []
+        searches = []
+        for method, path, body in BenchmarkStub.requests:
+            if path.endswith("/_bulk"):
+                bulk_lines.extend(body.decode().splitlines())
+            elif path.endswith("/_search"):
+                searches.append(json.loads(body.decode()))
+
+        bulk = report["operations"]["bulk"]
+        self.assertEqual(bulk["requests"], 3)
+        self.assertEqual(bulk["docs"], 25)
+        self.assertEqual(bulk["errors"], 0)
+        self.assertEqual(len(bulk_lines), 50)
+        self.assertIn('"_type": "doc"', bulk_lines[0])
+
+        match = report["operations"]["match"]
+        self.assertEqual(match["requests"], len(searches))
+        self.assertGreater(match["errors"], 0)
+        self.assertLess(match["errors"], match["requests"])
+        self.assertAlmostEqual(
+            match["error_rate"], float(match["errors"]) / match["requests"]
+        )
+        latency = match["latency_ms"]
+        self.assertTrue(
+            latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+        )
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import time
+from shutil import rmtree
+from unittest import TestCase
+
+from elasticsearch_runner.cache import InstallCache, path_size
+
+
+def write_file(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+class TestInstallCache(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = InstallCache(self.path)
+
+        for version in ["1.7.2", "2.1.0", "6.6.0"]:
+            write_file(os.path.join(self.path, "elasticsearch-%s.zip" % version), 100)
+            write_file(
+                os.path.join(self.path, "elasticsearch-%s" % version, "lib", "es.jar"),
+                200,
+            )
+            self.cache.touch("elasticsearch-%s" % version)
+            time.sleep(0.01)
+
+        write_file(os.path.join(self.path, "2.1.0-stale", "data", "segment"), 50)
+
+        self.live = os.path.join(self.path, "1.7.2-live")
+        write_file(os.path.join(self.live, "data", "segment"), 50)
+        with open(os.path.join(self.live, ".pid"), "w") as f:
+            f.write(str(os.getpid()))
+
+    def tearDown(self):
+        rmtree(self.path)
+
+    def test_entries(self):
+        entries = dict((e.name, e) for e in self.cache.entries())
+
+        self.assertEqual(
+            sorted(entries),
+            [
+                "1.7.2-live",
+                "2.1.0-stale",
+                "elasticsearch-1.7.2",
+                "elasticsearch-2.1.0",
+                "elasticsearch-6.6.0",
+            ],
+        )
+        self.assertEqual(entries["elasticsearch-2.1.0"].size, 300)
+        self.assertTrue(entries["1.7.2-live"].in_use)
+        self.assertTrue(entries["elasticsearch-1.7.2"].in_use)
+        self.assertFalse(entries["2.1.0-stale"].in_use)
+
+    def test_gc_evicts_least_recently_used(self):
+        self.cache.touch("2.1.0-stale")
+        evicted = self.cache.gc(budget=750, keep=["elasticsearch-6.6.0"])
+
+        # 1.7.2 is the oldest, but used by a live instance
+        self.assertEqual([e.name for e in evicted], ["elasticsearch-2.1.0"])
+        self.assertFalse(os.path.exists(os.path.join(self.path, "elasticsearch-2.1.0")))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.path, "elasticsearch-2.1.0.zip"))
+        )
+        self.assertTrue(os.path.exists(self.live))
+
+    def test_gc_keeps_what_cannot_be_evicted(self):
+        evicted = self.cache.gc(budget=0, keep=["elasticsearch-6.6.0"])
+
+        self.assertEqual(
+            sorted(e.name for e in evicted), ["2.1.0-stale", "elasticsearch-2.1.0"]
+        )
+        self.assertEqual(
+            sorted(e.name for e in self.cache.entries()),
+            ["1.7.2-live", "elasticsearch-1.7.2", "elasticsearch-6.6.0"],
+        )
+
+    def test_gc_without_budget(self):
+        self.assertEqual(self.cache.gc(), [])
+
+    def test_lease_keeps_starting_cluster(self):
+        with self.cache.lease("2.1.0-starting"):
+            evicted = self.cache.gc(budget=0)
+            self.assertTrue(os.path.exists(os.path.join(self.path, "2.1.0-starting")))
+
+        self.assertNotIn("2.1.0-starting", [e.name for e in evicted])
+        self.assertNotIn("elasticsearch-2.1.0", [e.name for e in evicted])
+        self.assertEqual(
+            [e.name for e in self.cache.gc(budget=0) if e.name.startswith("2.1.0")],
+            ["2.1.0-starting"],
+        )
+
+    def test_hard_links_and_plugin_archives(self):
+        base = os.path.join(self.path, "elasticsearch-6.6.0")
+        derived = base + "+plugins-1a2b3c4d"
+        os.makedirs(os.path.join(derived, "lib"))
+        os.link(
+            os.path.join(base, "lib", "es.jar"), os.path.join(derived, "lib", "es.jar")
+        )
+        write_file(os.path.join(derived, "plugins", "icu", "icu.jar"), 30)
+        write_file(os.path.join(self.path, "plugins", "6.6.0", "icu-6.6.0.zip"), 20)
+
+        seen = set()
+        self.assertEqual(path_size(base, seen) + path_size(derived, seen), 230)
+        self.assertEqual(path_size(derived), 230)
+
+        entries = dict((e.name, e) for e in self.cache.entries())
+        self.assertEqual(entries["elasticsearch-6.6.0"].size, 320)
+        self.assertEqual(entries[os.path.basename(derived)].size, 30)
+        self.assertIn(
+            os.path.join(self.path, "plugins", "6.6.0"),
+            entries["elasticsearch-6.6.0"].paths,
+        )
+
+        # the plain home is kept while its home with plugins is, and removing only the latter frees 30 bytes
+        with self.assertLogs("elasticsearch_runner.cache", "WARNING"):
+            evicted = self.cache.gc(budget=0, keep=[os.path.basename(derived)])
+        self.assertNotIn("elasticsearch-6.6.0", [e.name for e in evicted])
+        self.assertTrue(os.path.exists(base))
+
+        with self.assertLogs("elasticsearch_runner.cache", "WARNING"):
+            evicted = self.cache.gc(budget=0, keep=["elasticsearch-6.6.0"])
+        self.assertEqual([e.name for e in evicted], [os.path.basename(derived)])
+        self.assertTrue(os.path.exists(os.path.join(base, "lib", "es.jar")))
+
+        # both go together, with the version archive and the plugin archives
+        os.makedirs(os.path.join(derived, "lib"))
+        os.link(
+            os.path.join(base, "lib", "es.jar"), os.path.join(derived, "lib", "es.jar")
+        )
+        evicted = self.cache.gc(budget=400)
+        self.assertEqual(
+            [e.name for e in evicted],
+            ["elasticsearch-6.6.0", os.path.basename(derived)],
+        )
+        self.assertFalse(os.path.exists(derived))
+        self.assertFalse(os.path.exists(os.path.join(self.path, "plugins", "6.6.0")))
+        self.assertLessEqual(path_size(self.path), 400)
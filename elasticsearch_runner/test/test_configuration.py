@@ -21,10 +21,19 @@ class TestConfiguration(TestCase):
             generate_config(cluster_name="ba"),
         )
 
+    def test_generate_config_http_port(self):
+        self.assertEqual(
+            {
+                "http": {"cors": {"enabled": True, "allow-origin": "*"}, "port": 9250},
+                "cluster": {"name": "ba"},
+            },
+            generate_config(cluster_name="ba", http_port=9250),
+        )
+
     def test_serialize_config(self):
         s = StringIO()
         c = generate_config(cluster_name="ba")
         serialize_config(s, c)
         s.seek(0)
 
-        self.assertEqual(c, yaml.load(s))
+        self.assertEqual(c, yaml.safe_load(s))
@@ -6,11 +6,15 @@ import unittest
 
 import requests
 
+from elasticsearch_runner.matrix import run_matrix
 from elasticsearch_runner.runner import (
     ElasticsearchRunner,
+    ElasticsearchState,
     process_exists,
     parse_es_log_header,
 )
+from elasticsearch_runner.test.fake_es import FakeElasticsearchTestCase
+from elasticsearch_runner.test.stub_server import StubElasticsearch, StubServerTestCase
 
 
 @unittest.skip
@@ -170,6 +174,34 @@ class TestElasticsearchRunner(TestCase):
         finally:
             self.runner.stop()
 
+    def test_restart_keeps_data(self):
+        self.runner = ElasticsearchRunner()
+        self.runner.install()
+        self.runner.run()
+        self.runner.wait_for_green(timeout=60)
+
+        url = "http://localhost:%d/books/doc/1" % self.runner.es_state.port
+        requests.put(url + "?refresh=true", json={"title": "Dune"})
+
+        self.runner.restart()
+        self.runner.wait_for_green(timeout=60)
+
+        doc = json.loads(requests.get(url).text)
+        self.assertEqual(doc["_source"], {"title": "Dune"})
+
+    def test_run_matrix(self):
+        def check_version(runner):
+            status = requests.get("http://localhost:%d" % runner.es_state.port)
+            return json.loads(status.text)["version"]["number"]
+
+        results = run_matrix(["2.1.0", "6.6.0"], check_version)
+
+        self.assertEqual(list(results), ["2.1.0", "6.6.0"])
+        for version, result in results.items():
+            self.assertTrue(result.passed, result.error)
+            self.assertEqual(result.result, version)
+        self.assertNotEqual(results["2.1.0"].port, results["6.6.0"].port)
+
     def test_parse_log_header_esv2_format(self):
         testStream = io.StringIO()
         testStream.write(
@@ -201,3 +233,179 @@ class TestElasticsearchRunner(TestCase):
         server_pid, es_port = parse_es_log_header(testStream)
         self.assertEqual(server_pid, 8248)
         self.assertEqual(es_port, 9200)
+
+
+class TestSharedCluster(FakeElasticsearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.runner = ElasticsearchRunner(
+            install_path=self.install_path, version="6.6.0", http_port=9876
+        )
+
+    def tearDown(self):
+        self.runner.stop()
+        super().tearDown()
+
+    def test_second_runner_attaches(self):
+        self.runner.run()
+        self.assertTrue(self.runner.is_running())
+
+        runner2 = ElasticsearchRunner(install_path=self.install_path, version="6.6.0")
+        runner2.run()
+
+        self.assertIsNotNone(runner2.es_state)
+        self.assertEqual(runner2.es_state.server_pid, self.runner.es_state.server_pid)
+        self.assertEqual(runner2.es_state.port, 9876)
+        self.assertEqual(runner2.es_config["path"], self.runner.es_config["path"])
+
+        runner2.stop()
+        self.assertFalse(self.runner.is_running())
+        self.assertIsNone(runner2.es_state)
+
+    def test_attach_after_own_stop(self):
+        self.runner.run()
+        self.runner.stop()
+
+        runner2 = ElasticsearchRunner(
+            install_path=self.install_path,
+            version="6.6.0",
+            http_port=9876,
+            cluster_name=self.runner.cluster_name,
+        )
+        runner2.run()
+        try:
+            self.runner.run()
+            self.assertEqual(
+                self.runner.es_state.server_pid, runner2.es_state.server_pid
+            )
+            self.runner.wait_for_green(timeout=0.1)
+        finally:
+            runner2.stop()
+
+    def test_stop_unstarted_runner(self):
+        self.runner.stop()
+        self.assertIsNone(self.runner.es_state)
+
+
+class TestRestart(FakeElasticsearchTestCase):
+    def test_restart_keeps_data(self):
+        runner = ElasticsearchRunner(install_path=self.install_path, version="6.6.0")
+        runner.update_settings({"thread_pool.search.size": 4})
+        runner.run()
+        try:
+            data_path = runner.es_config["path"]["data"]
+            segment_fn = os.path.join(data_path, "segment")
+            open(segment_fn, "w").close()
+            server_pid = runner.es_state.server_pid
+
+            runner.restart()
+
+            self.assertTrue(runner.is_running())
+            self.assertFalse(process_exists(server_pid))
+            self.assertNotEqual(runner.es_state.server_pid, server_pid)
+            self.assertEqual(runner.es_config["path"]["data"], data_path)
+            self.assertTrue(os.path.exists(segment_fn))
+            self.assertEqual(runner.es_config["thread_pool.search.size"], 4)
+        finally:
+            runner.stop()
+
+        self.assertFalse(os.path.exists(data_path))
+
+
+class StubSettingsApi(StubElasticsearch):
+    static_keys = ["thread_pool.search.size", "index.codec"]
+
+    def respond(self, body):
+        text = body.decode() or "{}"
+        if any(key.split(".")[-1] in text for key in self.static_keys):
+            closed = any(path.endswith("/_close") for _, path, _ in self.requests)
+            if not (self.path.endswith("/_settings") and closed):
+                return 400, {"error": "setting [x], not dynamically updateable"}
+        elif self.path == "/_cluster/settings":
+            persistent = json.loads(text)["persistent"]
+            # reset settings are left out of the response
+            persistent = dict((k, v) for k, v in persistent.items() if v is not None)
+            return 200, {"acknowledged": True, "persistent": persistent}
+
+        return 200, {"acknowledged": True}
+
+
+class TestUpdateSettings(StubServerTestCase):
+    handler = StubSettingsApi
+
+    def setUp(self):
+        super().setUp()
+
+        self.restarts = 0
+        self.runner = ElasticsearchRunner(install_path="fakepath")
+        self.runner.es_state = ElasticsearchState(
+            server_pid=os.getpid(),
+            wrapper_pid=None,
+            port=self.port,
+            config_fn=None,
+        )
+
+        def restart():
+            self.restarts += 1
+            return self.runner
+
+        self.runner.restart = restart
+
+    def test_dynamic_cluster_settings(self):
+        self.runner.update_settings({"indices.recovery.max_bytes_per_sec": "100mb"})
+
+        self.assertEqual(self.restarts, 0)
+        self.assertEqual(self.runner.settings, {})
+        self.assertEqual(
+            [
+                (method, path, json.loads(body))
+                for method, path, body in StubSettingsApi.requests
+            ],
+            [
+                (
+                    "PUT",
+                    "/_cluster/settings",
+                    {"persistent": {"indices.recovery.max_bytes_per_sec": "100mb"}},
+                )
+            ],
+        )
+
+    def test_reset_cluster_settings(self):
+        self.runner.update_settings({"indices.recovery.max_bytes_per_sec": None})
+
+        self.assertEqual(self.restarts, 0)
+        self.assertEqual(self.runner.settings, {})
+
+    def test_static_cluster_settings_restart(self):
+        self.runner.update_settings(
+            {"thread_pool.search.size": 4, "cluster.routing.allocation.enable": "all"}
+        )
+
+        self.assertEqual(self.restarts, 1)
+        self.assertEqual(self.runner.settings, {"thread_pool.search.size": 4})
+
+    def test_static_index_settings(self):
+        self.runner.update_settings({"codec": "best_compression"}, index="books")
+
+        self.assertEqual(self.restarts, 0)
+        self.assertEqual(
+            [(method, path) for method, path, _ in StubSettingsApi.requests],
+            [
+                ("PUT", "/books/_settings"),
+                ("POST", "/books/_close"),
+                ("PUT", "/books/_settings"),
+                ("POST", "/books/_open"),
+            ],
+        )
+
+    def test_index_settings_need_running_node(self):
+        self.runner.es_state = None
+
+        self.assertRaises(
+            RuntimeError,
+            self.runner.update_settings,
+            {"refresh_interval": "30s"},
+            index="books",
+        )
+        self.runner.update_settings({"thread_pool.search.size": 4})
+        self.assertEqual(self.runner.settings, {"thread_pool.search.size": 4})
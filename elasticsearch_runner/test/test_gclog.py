@@ -0,0 +1,159 @@
+import os
+import tempfile
+from shutil import copyfile, rmtree
+from unittest import TestCase
+
+from elasticsearch_runner.configuration import package_path
+from elasticsearch_runner.gclog import (
+    analyze_gc_logs,
+    check_regression,
+    gc_log_files,
+    parse_gc_log,
+    parse_size,
+    set_gc_log_path,
+    summarize,
+)
+
+RESOURCES = os.path.join(os.path.dirname(__file__), "resources")
+
+
+def parse_fixture(name):
+    with open(os.path.join(RESOURCES, name)) as f:
+        return list(parse_gc_log(f))
+
+
+class TestGCLog(TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size("272640K"), 272640 * 1024)
+        self.assertEqual(parse_size("24.0M"), 24 * 1024**2)
+        self.assertEqual(parse_size("0.0B"), 0)
+        self.assertIsNone(parse_size(None))
+
+    def test_jdk8_cms(self):
+        pauses = parse_fixture("gc_jdk8_cms.log")
+
+        self.assertEqual(
+            [p.cause for p in pauses],
+            [
+                "Allocation Failure",
+                "Allocation Failure",
+                "CMS Initial Mark",
+                "CMS Final Remark",
+                "Allocation Failure",
+            ],
+        )
+        self.assertEqual([p.full for p in pauses], [False] * 4 + [True])
+        self.assertAlmostEqual(pauses[1].pause, 0.0401)
+        # the whole heap, not the young generation of the nested ParNew
+        self.assertEqual(pauses[1].heap_before, 282880 * 1024)
+        self.assertEqual(pauses[1].heap_after, 30720 * 1024)
+        self.assertEqual(pauses[1].heap_total, 1014528 * 1024)
+        self.assertEqual(pauses[1].uptime, 5.0)
+        self.assertEqual(pauses[1].timestamp, 1549357205.0)
+        # not the metaspace
+        self.assertEqual(pauses[4].heap_after, 600000 * 1024)
+        self.assertIsNone(pauses[3].heap_before)
+
+    def test_jdk8_g1(self):
+        pauses = parse_fixture("gc_jdk8_g1.log")
+
+        self.assertEqual([p.pause for p in pauses], [0.01, 0.003, 1.2])
+        self.assertEqual(pauses[0].heap_before, 50 * 1024**2)
+        self.assertEqual(pauses[0].heap_after, 10 * 1024**2)
+        self.assertEqual(pauses[2].heap_after, 500 * 1024**2)
+        self.assertTrue(pauses[2].full)
+
+    def test_unified(self):
+        pauses = parse_fixture("gc_unified_g1.log")
+
+        self.assertEqual([p.pause for p in pauses], [0.01, 0.003, 0.0005, 0.02, 1.2])
+        self.assertEqual(pauses[0].cause, "Young (Normal) (G1 Evacuation Pause)")
+        self.assertEqual([p.full for p in pauses], [False] * 4 + [True])
+        self.assertEqual(pauses[3].heap_before, 110 * 1024**2)
+        self.assertEqual(pauses[3].heap_after, 30 * 1024**2)
+        self.assertEqual(pauses[3].timestamp, 1549357204.0)
+
+    def test_summarize(self):
+        summary = summarize(parse_fixture("gc_unified_g1.log"))
+
+        self.assertEqual(summary.pauses, 5)
+        self.assertEqual(summary.full_pauses, 1)
+        self.assertAlmostEqual(summary.total_pause, 1.2335)
+        self.assertEqual(summary.max_pause, 1.2)
+        self.assertEqual(summary.p99_pause, 1.2)
+        self.assertEqual(summary.heap_after_gc_max, 500 * 1024**2)
+        # 50M, 0M, 50M and 970M allocated between the pauses, over 5.19 seconds
+        self.assertAlmostEqual(
+            summary.allocation_rate, 1070 * 1024**2 / 5.19, delta=1024
+        )
+
+        since = summarize(parse_fixture("gc_unified_g1.log"), since=1549357204.0)
+        self.assertEqual(since.pauses, 2)
+        self.assertEqual(since.max_pause, 1.2)
+
+        empty = summarize([])
+        self.assertEqual(empty.pauses, 0)
+        self.assertIsNone(empty.p99_pause)
+        self.assertIsNone(empty.allocation_rate)
+
+    def test_check_regression(self):
+        summary = summarize(parse_fixture("gc_jdk8_g1.log"))
+
+        self.assertEqual(check_regression(summary, summary), [])
+        self.assertEqual(check_regression(summary, {"max_pause": 1.0}), [])
+        self.assertEqual(
+            check_regression(summary, {"max_pause": 1.0}, tolerance=0.1),
+            ["max_pause 1200.0 ms over baseline 1000.0 ms"],
+        )
+        self.assertEqual(len(check_regression(summary, summarize([]))), 0)
+
+
+class TestGCLogFiles(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.path)
+
+    def test_analyze_rotated_files(self):
+        for i, name in enumerate(["gc_jdk8_g1.log", "gc_jdk8_cms.log"]):
+            fn = os.path.join(self.path, "gc.log.%d" % i)
+            copyfile(os.path.join(RESOURCES, name), fn)
+            os.utime(fn, (1000 + i, 1000 + i))
+
+        fns = gc_log_files(self.path)
+        self.assertEqual([os.path.basename(fn) for fn in fns], ["gc.log.0", "gc.log.1"])
+        self.assertEqual(analyze_gc_logs(fns).pauses, 8)
+
+    def test_set_gc_log_path(self):
+        options_fn = os.path.join(self.path, "jvm.options")
+        copyfile(
+            os.path.join(
+                package_path(), "elasticsearch_runner", "resources", "jvm.options"
+            ),
+            options_fn,
+        )
+        gc_log_fn = os.path.join(self.path, "log", "gc.log")
+
+        set_gc_log_path(options_fn, gc_log_fn)
+
+        with open(options_fn) as f:
+            options = f.read()
+        self.assertIn("8:-Xloggc:%s\n" % gc_log_fn, options)
+        self.assertIn(
+            '9-:-Xlog:gc*,gc+age=trace,safepoint:file="%s":utctime,pid,tags:'
+            % gc_log_fn,
+            options,
+        )
+        self.assertNotIn("logs/gc.log", options)
+
+    def test_set_gc_log_path_with_whitespace(self):
+        options_fn = os.path.join(self.path, "jvm.options")
+        with open(options_fn, "w") as f:
+            f.write("8:-Xloggc:logs/gc.log\n")
+
+        self.assertFalse(
+            set_gc_log_path(options_fn, os.path.join(self.path, "my log", "gc.log"))
+        )
+        with open(options_fn) as f:
+            self.assertEqual(f.read(), "8:-Xloggc:logs/gc.log\n")
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from shutil import rmtree
+from unittest import TestCase
+
+from elasticsearch_runner.configuration import package_path
+
+HEAVY_MODULES = ["requests", "tqdm", "psutil", "yaml", "plac"]
+
+
+def best_run_time(args, cwd, runs=5):
+    env = dict(os.environ, PYTHONPATH=package_path())
+    best = None
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=cwd, env=env, capture_output=True, check=False)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+class TestMain(TestCase):
+    def setUp(self):
+        self.cwd = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.cwd)
+
+    def test_runner_import_is_lazy(self):
+        out = subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                "import sys, elasticsearch_runner.runner as r; r.ElasticsearchRunner(install_path='x'); "
+                "print(' '.join(m for m in %r if m in sys.modules))" % HEAVY_MODULES,
+            ],
+            cwd=self.cwd,
+            env=dict(os.environ, PYTHONPATH=package_path()),
+        )
+        self.assertEqual(out.decode().strip(), "")
+
+    def test_status(self):
+        # without Java, which only matters for starting the engine
+        env = dict(os.environ, PYTHONPATH=package_path(), PATH="")
+        env.pop("JAVA_HOME", None)
+
+        proc = subprocess.run(
+            [sys.executable, "-m", "elasticsearch_runner", "status", "-v", "6.6.0"],
+            cwd=self.cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self.assertEqual(proc.returncode, 3)
+        self.assertEqual(
+            proc.stdout.decode().strip(), "Elasticsearch 6.6.0 is not running"
+        )
+        self.assertEqual(proc.stderr.decode(), "")
+
+    def test_status_running(self):
+        cluster_path = os.path.join(self.cwd, ".esrunner", "6.6.0-elasticsearch_runner")
+        os.makedirs(cluster_path)
+        with open(os.path.join(cluster_path, ".pid"), "w") as f:
+            f.write(str(os.getpid()))
+
+        proc = subprocess.run(
+            [sys.executable, "-m", "elasticsearch_runner", "status", "-v", "6.6.0"],
+            cwd=self.cwd,
+            env=dict(os.environ, PYTHONPATH=package_path()),
+            stdout=subprocess.PIPE,
+        )
+        self.assertEqual(proc.returncode, 0)
+        self.assertEqual(proc.stdout.decode().strip(), "Elasticsearch 6.6.0 is running")
+
+    def test_gc_budget(self):
+        proc = subprocess.run(
+            [sys.executable, "-m", "elasticsearch_runner", "gc", "--budget", "1.5GB"],
+            cwd=self.cwd,
+            env=dict(os.environ, PYTHONPATH=package_path()),
+            stdout=subprocess.PIPE,
+        )
+        self.assertEqual(proc.returncode, 0)
+        self.assertEqual(proc.stdout.decode().strip(), "Install path uses 0 MB")
+
+    def test_status_import_time(self):
+        # measured against a bare interpreter, so only our own overhead counts
+        baseline = best_run_time([sys.executable, "-c", "pass"], self.cwd)
+        status = best_run_time(
+            [sys.executable, "-m", "elasticsearch_runner", "status"], self.cwd
+        )
+        self.assertLess(status - baseline, 0.1)
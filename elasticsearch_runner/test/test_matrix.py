@@ -0,0 +1,80 @@
+import socket
+from unittest import TestCase
+
+from elasticsearch_runner.matrix import (
+    MatrixResult,
+    format_results,
+    free_port,
+    run_matrix,
+)
+from elasticsearch_runner.runner import process_exists
+from elasticsearch_runner.test.fake_es import FakeElasticsearchTestCase
+
+
+class TestMatrix(TestCase):
+    def test_free_port(self):
+        port = free_port()
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            s.bind(("localhost", port))
+        finally:
+            s.close()
+
+    def test_format_results(self):
+        results = {
+            "6.6.0": MatrixResult("6.6.0", 9201, True, 0, None, 1.0, 12.25, 3.0),
+            "1.7.2": MatrixResult("1.7.2", 9202, False, None, "boom", 0.5, None, None),
+        }
+
+        self.assertEqual(
+            format_results(results).splitlines(),
+            [
+                "version    status   install     start       run",
+                "6.6.0      passed      1.0s     12.2s      3.0s",
+                "1.7.2      FAILED      0.5s         -         -",
+            ],
+        )
+
+
+class TestRunMatrix(FakeElasticsearchTestCase):
+    versions = ["6.6.0", "6.7.0", "5.6.16"]
+
+    def test_run_matrix(self):
+        self.write_script("echo 'bootstrap checks failed'\nexit 78\n", "5.6.16")
+        runners = {}
+
+        def check(runner):
+            runners[runner.version] = (
+                runner.es_state.port,
+                runner.cluster_name,
+                runner.es_state.server_pid,
+            )
+            if runner.version == "6.7.0":
+                raise AssertionError("search failed")
+
+            return runner.is_running()
+
+        # 7.0 is not a valid version and fails to install
+        results = run_matrix(
+            ["6.6.0", "6.7.0", "5.6.16", "7.0", "6.6.0"],
+            check,
+            install_path=self.install_path,
+            green_timeout=0.1,
+        )
+
+        self.assertEqual(list(results), ["6.6.0", "6.7.0", "5.6.16", "7.0"])
+        self.assertTrue(results["6.6.0"].passed, results["6.6.0"].error)
+        self.assertTrue(results["6.6.0"].result)
+        self.assertIn("search failed", results["6.7.0"].error)
+        self.assertIn("bootstrap checks failed", results["5.6.16"].error)
+        self.assertIsNone(results["5.6.16"].run_time)
+        self.assertIsNotNone(results["7.0"].error)
+        self.assertIsNone(results["7.0"].start_time)
+
+        self.assertEqual(sorted(runners), ["6.6.0", "6.7.0"])
+        self.assertNotEqual(runners["6.6.0"][0], runners["6.7.0"][0])
+        self.assertNotEqual(runners["6.6.0"][1], runners["6.7.0"][1])
+        for version, (port, cluster_name, server_pid) in runners.items():
+            self.assertEqual(results[version].port, port)
+            self.assertIn(version.replace(".", "_"), cluster_name)
+            self.assertFalse(process_exists(server_pid))
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+from shutil import rmtree
+from subprocess import Popen, PIPE, STDOUT
+from unittest import TestCase
+
+from elasticsearch_runner.output import OutputBuffer, MAX_LINE_LENGTH
+
+
+def run_python(code, buffer):
+    proc = Popen([sys.executable, "-c", code], stdout=PIPE, stderr=STDOUT)
+    buffer.attach(proc.stdout)
+    proc.wait()
+    buffer.join(5)
+
+    return buffer
+
+
+class TestOutputBuffer(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.path)
+
+    def test_tail_is_bounded(self):
+        buffer = run_python(
+            "import sys\n"
+            "for i in range(5000): print('line %d' % i)\n"
+            "sys.stderr.write('failed\\n')",
+            OutputBuffer(max_lines=10),
+        )
+
+        self.assertEqual(len(buffer.tail()), 10)
+        self.assertEqual(buffer.tail(2), ["line 4999", "failed"])
+        self.assertEqual(buffer.tail(0), [])
+
+    def test_long_lines_are_truncated(self):
+        buffer = run_python(
+            "print('x' * %d, end='')" % (MAX_LINE_LENGTH * 3), OutputBuffer()
+        )
+
+        self.assertTrue(all(len(line) <= MAX_LINE_LENGTH for line in buffer.tail()))
+
+    def test_spill_file_is_rotated(self):
+        log_fn = os.path.join(self.path, "es.out")
+        run_python(
+            "for i in range(2000): print('%04d' % i)",
+            OutputBuffer(log_fn=log_fn, log_max_bytes=1000, log_backup_count=2),
+        )
+
+        self.assertEqual(
+            sorted(os.listdir(self.path)), ["es.out", "es.out.1", "es.out.2"]
+        )
+        for fn in os.listdir(self.path):
+            self.assertLessEqual(os.path.getsize(os.path.join(self.path, fn)), 1000)
+
+        with open(log_fn) as f:
+            self.assertEqual(f.read().split()[-1], "1999")
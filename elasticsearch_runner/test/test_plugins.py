@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import unittest
+from shutil import rmtree
+from unittest import TestCase
+
+from elasticsearch_runner.plugins import (
+    PLUGIN_MANIFEST_FN,
+    derive_home,
+    install_plugins,
+    plugin_install_call,
+    plugin_url,
+    plugins_home_folder,
+)
+
+
+class TestPlugins(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.base_home = os.path.join(self.path, "elasticsearch-6.6.0")
+
+        for sub_path, content in [
+            ("lib/elasticsearch.jar", "jar"),
+            ("config/jvm.options", "-Xmx1g"),
+            (
+                "bin/elasticsearch-plugin",
+                'echo "$@" >> "$(dirname "$0")/../installed.txt"\n',
+            ),
+        ]:
+            fn = os.path.join(self.base_home, sub_path)
+            os.makedirs(os.path.dirname(fn), exist_ok=True)
+            with open(fn, "w") as f:
+                f.write(content)
+
+    def tearDown(self):
+        rmtree(self.path)
+
+    def test_plugins_home_folder(self):
+        self.assertEqual(
+            plugins_home_folder("elasticsearch-6.6.0", []), "elasticsearch-6.6.0"
+        )
+        folder = plugins_home_folder("elasticsearch-6.6.0", ["b", "a"])
+        self.assertTrue(folder.startswith("elasticsearch-6.6.0+plugins-"))
+        self.assertEqual(folder, plugins_home_folder("elasticsearch-6.6.0", ["a", "b"]))
+        self.assertNotEqual(folder, plugins_home_folder("elasticsearch-6.6.0", ["a"]))
+
+    def test_plugin_url(self):
+        self.assertEqual(
+            plugin_url("analysis-icu", "6.6.0"),
+            "https://artifacts.elastic.co/downloads/elasticsearch-plugins/analysis-icu/analysis-icu-6.6.0.zip",
+        )
+        self.assertEqual(
+            plugin_url("analysis-icu", "2.1.0"),
+            "https://download.elastic.co/elasticsearch/release/org/elasticsearch/plugin/analysis-icu/2.1.0/analysis-icu-2.1.0.zip",
+        )
+        self.assertEqual(
+            plugin_url("https://example.com/ours.zip", "6.6.0"),
+            "https://example.com/ours.zip",
+        )
+        self.assertRaises(ValueError, plugin_url, "analysis-icu", "1.7.2")
+
+    def test_plugin_install_call(self):
+        self.assertEqual(
+            plugin_install_call("/es", "6.6.0", "icu", "/cache/icu.zip", "posix"),
+            [
+                "/bin/sh",
+                os.path.join("/es", "bin", "elasticsearch-plugin"),
+                "install",
+                "--batch",
+                "file:///cache/icu.zip",
+            ],
+        )
+        self.assertEqual(
+            plugin_install_call("/es", "1.7.2", "icu", "/cache/icu.zip", "posix")[2:],
+            ["--url", "file:///cache/icu.zip", "--install", "icu"],
+        )
+
+    def test_derive_home(self):
+        es_home = os.path.join(self.path, "elasticsearch-6.6.0+plugins-x")
+        derive_home(self.base_home, es_home)
+
+        jar = os.path.join("lib", "elasticsearch.jar")
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.base_home, jar), os.path.join(es_home, jar)
+            )
+        )
+        options = os.path.join("config", "jvm.options")
+        self.assertFalse(
+            os.path.samefile(
+                os.path.join(self.base_home, options), os.path.join(es_home, options)
+            )
+        )
+
+    @unittest.skipIf(os.name == "nt", "uses a shell script as fake plugin installer")
+    def test_install_plugins_is_cached(self):
+        downloads = []
+
+        def download(url, dest_path):
+            downloads.append(url)
+            os.makedirs(dest_path, exist_ok=True)
+            fn = os.path.join(dest_path, os.path.basename(url))
+            open(fn, "w").close()
+            return fn
+
+        es_home = os.path.join(self.path, "elasticsearch-6.6.0+plugins-x")
+        derive_home(self.base_home, es_home)
+        plugins = ["analysis-icu", "https://example.com/our-analyzers-6.6.0.zip"]
+
+        installed = install_plugins(self.path, "6.6.0", es_home, plugins, download)
+        self.assertEqual(installed, plugins)
+        self.assertEqual(len(downloads), 2)
+        with open(os.path.join(es_home, "installed.txt")) as f:
+            self.assertEqual(len(f.read().splitlines()), 2)
+        with open(os.path.join(es_home, PLUGIN_MANIFEST_FN)) as f:
+            self.assertEqual(sorted(json.load(f)), sorted(plugins))
+
+        self.assertEqual(
+            install_plugins(self.path, "6.6.0", es_home, plugins, download), []
+        )
+        self.assertEqual(len(downloads), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.base_home, "installed.txt")))
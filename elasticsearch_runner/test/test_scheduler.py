@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import time
+from shutil import rmtree
+from unittest import TestCase
+
+from elasticsearch_runner.scheduler import (
+    AdmissionScheduler,
+    AdmissionTimeout,
+    STATE_FN,
+    heap_size_from_jvm_options,
+    parse_heap_size,
+)
+
+GB = 1024**3
+
+
+class TestScheduler(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.path)
+
+    def test_parse_heap_size(self):
+        self.assertEqual(parse_heap_size("512m"), 512 * 1024**2)
+        self.assertEqual(parse_heap_size("2G"), 2 * GB)
+        self.assertEqual(parse_heap_size("1024"), 1024)
+        self.assertRaises(ValueError, parse_heap_size, "lots")
+
+    def test_heap_size_from_jvm_options(self):
+        fn = os.path.join(self.path, "jvm.options")
+        with open(fn, "w") as f:
+            f.write("# -Xmx8g\n-Xms2g\n-Xmx2g\n")
+
+        self.assertEqual(heap_size_from_jvm_options(fn, {}), 2 * GB)
+        self.assertEqual(
+            heap_size_from_jvm_options(fn, {"ES_JAVA_OPTS": "-Xms512m -Xmx512m"}),
+            512 * 1024**2,
+        )
+
+    def test_admits_until_budget_is_used(self):
+        scheduler = AdmissionScheduler(
+            self.path, memory_budget=2 * GB, poll_interval=0.01
+        )
+        self.assertEqual(scheduler.capacity(GB), 2)
+
+        first = scheduler.acquire(GB, timeout=1)
+        second = scheduler.acquire(GB, timeout=1)
+        self.assertEqual(scheduler.capacity(GB), 0)
+        self.assertRaises(AdmissionTimeout, scheduler.acquire, GB, timeout=0.05)
+
+        scheduler.release(first)
+        third = scheduler.acquire(GB, timeout=1)
+        self.assertGreaterEqual(third.waited, 0)
+
+        scheduler.release(second)
+        scheduler.release(third)
+        self.assertEqual(scheduler.capacity(GB), 2)
+
+    def test_free_memory_limits_admission(self):
+        scheduler = AdmissionScheduler(
+            self.path,
+            headroom=GB,
+            poll_interval=0.01,
+            memory_probe=lambda: (3 * GB, 3 * GB),
+        )
+        self.assertEqual(scheduler.capacity(GB), 2)
+
+        # the new node has not touched its heap yet, but its reservation still counts
+        ticket = scheduler.acquire(GB, timeout=1)
+        self.assertEqual(scheduler.capacity(GB), 1)
+        scheduler.release(ticket)
+
+    def test_admits_lone_request_that_does_not_fit(self):
+        scheduler = AdmissionScheduler(self.path, memory_budget=GB)
+        ticket = scheduler.acquire(4 * GB, timeout=1)
+        self.assertEqual(ticket.heap_size, 4 * GB)
+        scheduler.release(ticket)
+
+    def test_requeues_when_state_is_lost(self):
+        scheduler = AdmissionScheduler(self.path, memory_budget=GB, poll_interval=0.01)
+        state_fn = os.path.join(self.path, STATE_FN)
+        first = scheduler.acquire(GB, timeout=1)
+
+        tickets = []
+        queued = threading.Thread(
+            target=lambda: tickets.append(scheduler.acquire(GB, timeout=5))
+        )
+        queued.start()
+        while '"queue": [{' not in open(state_fn).read():
+            time.sleep(0.01)
+
+        # lost with the reservation of the first node, so the queued start is admitted
+        os.remove(state_fn)
+        queued.join(5)
+
+        self.assertEqual(len(tickets), 1)
+        scheduler.release(tickets[0])
+        scheduler.release(first)
@@ -0,0 +1,16 @@
+from unittest import TestCase
+
+from elasticsearch_runner.util import parse_size
+
+GB = 1024**3
+
+
+class TestUtil(TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size("5g"), 5 * GB)
+        self.assertEqual(parse_size("5GB"), 5 * GB)
+        self.assertEqual(parse_size("1.5g"), int(1.5 * GB))
+        self.assertEqual(parse_size("512 MiB"), 512 * 1024**2)
+        self.assertEqual(parse_size("1024"), 1024)
+        self.assertRaises(ValueError, parse_size, "lots")
+        self.assertRaises(ValueError, parse_size, "5x")
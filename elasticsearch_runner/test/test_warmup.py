@@ -0,0 +1,37 @@
+from elasticsearch_runner.test.stub_server import StubElasticsearch, StubServerTestCase
+from elasticsearch_runner.warmup import WARMUP_INDEX, converged, warm_up
+
+
+class TestWarmup(StubServerTestCase):
+    def test_converged(self):
+        self.assertFalse(converged([1.0, 0.5, 0.2], 5, 0.1))
+        self.assertFalse(converged([1.0, 0.5, 0.2, 0.2, 0.2, 0.2], 5, 0.1))
+        self.assertTrue(converged([1.0, 0.5, 0.2, 0.2, 0.2, 0.2, 0.21], 5, 0.1))
+
+    def test_warm_up(self):
+        report = warm_up(self.port, "6.6.0", docs_per_round=3, max_rounds=4, window=10)
+
+        self.assertEqual(len(report.rounds), 4)
+        self.assertFalse(report.converged)
+
+        methods = [
+            (method, path.split("?")[0])
+            for method, path, _ in StubElasticsearch.requests
+        ]
+        self.assertEqual(methods[0], ("PUT", "/" + WARMUP_INDEX))
+        self.assertEqual(methods[-1], ("DELETE", "/" + WARMUP_INDEX))
+        self.assertEqual(methods.count(("POST", "/_bulk")), 4)
+
+        bulk = [
+            body for method, path, body in StubElasticsearch.requests if "_bulk" in path
+        ]
+        self.assertEqual(len(bulk[0].splitlines()), 6)
+        self.assertIn(b'"_type": "doc"', bulk[0])
+
+    def test_warm_up_typeless_bulk(self):
+        warm_up(self.port, "7.0.0", docs_per_round=1, max_rounds=1)
+
+        bulk = [
+            body for method, path, body in StubElasticsearch.requests if "_bulk" in path
+        ]
+        self.assertNotIn(b"_type", bulk[0])
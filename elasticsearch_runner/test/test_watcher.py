@@ -0,0 +1,80 @@
+import sys
+import threading
+from subprocess import Popen
+from unittest import TestCase
+
+from elasticsearch_runner.runner import ElasticsearchRunner, ElasticsearchStartError
+from elasticsearch_runner.scheduler import AdmissionScheduler
+from elasticsearch_runner.test.fake_es import FakeElasticsearchTestCase
+from elasticsearch_runner.watcher import ProcessWatcher, wait_for_pid
+
+
+def python_process(code):
+    return Popen([sys.executable, "-c", code])
+
+
+class TestProcessWatcher(TestCase):
+    def test_unexpected_exit_calls_back(self):
+        exits = []
+        called = threading.Event()
+
+        def on_exit(returncode):
+            exits.append(returncode)
+            called.set()
+
+        watcher = ProcessWatcher(python_process("exit(3)"), on_exit=on_exit)
+
+        self.assertTrue(watcher.wait(10))
+        self.assertTrue(called.wait(10))
+        self.assertEqual(watcher.returncode, 3)
+        self.assertEqual(exits, [3])
+
+    def test_expected_exit(self):
+        exits = []
+        process = python_process("import time; time.sleep(60)")
+        watcher = ProcessWatcher(process, on_exit=exits.append)
+
+        self.assertFalse(watcher.wait(0.1))
+        watcher.expect_exit()
+        process.terminate()
+
+        self.assertTrue(watcher.wait(10))
+        self.assertEqual(exits, [])
+
+    def test_wait_for_pid(self):
+        process = python_process("import time; time.sleep(0.2)")
+        wait_for_pid(process.pid)
+        self.assertIsNotNone(process.wait(10))
+
+
+class TestRunnerCrashDetection(FakeElasticsearchTestCase):
+    script = "echo 'bootstrap checks failed'\nexit 78\n"
+
+    def test_run_fails_fast(self):
+        runner = ElasticsearchRunner(install_path=self.install_path, version="6.6.0")
+
+        with self.assertRaises(ElasticsearchStartError) as ctx:
+            runner.run()
+
+        self.assertEqual(ctx.exception.returncode, 78)
+        self.assertEqual(ctx.exception.lines, ["bootstrap checks failed"])
+        self.assertFalse(runner.is_running())
+
+    def test_crash_releases_admission(self):
+        self.write_script('echo $$ > "$2"\nsleep 0.5\nexit 1\n')
+
+        exited = threading.Event()
+        scheduler = AdmissionScheduler(self.install_path, memory_budget=1024**3)
+        runner = ElasticsearchRunner(
+            install_path=self.install_path,
+            version="6.6.0",
+            admission=scheduler,
+            on_exit=lambda runner, returncode: exited.set(),
+        )
+
+        runner.run()
+        self.assertEqual(scheduler.capacity(1024**3), 0)
+
+        self.assertTrue(exited.wait(10))
+        self.assertIsNone(runner.admission_ticket)
+        self.assertEqual(scheduler.capacity(1024**3), 1)
@@ -0,0 +1,67 @@
+import os
+import re
+
+"""
+Small helpers shared by the admission scheduler, the install path cache and the command line.
+"""
+
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def parse_size(value):
+    """
+    Parse a size such as 5g, 5GB, 1.5g or 512MiB into bytes. Units are binary, like JVM memory sizes.
+
+    :param value: Size string, a plain number is in bytes.
+    :type value: str|unicode
+    :rtype : int
+    :return: size in bytes
+    """
+    m = re.match(r"^\s*(\d+(?:\.\d*)?|\.\d+)\s*([kmgt]?)(?:i?b)?\s*$", value.lower())
+    if not m:
+        raise ValueError("Invalid size %r" % value)
+
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2)])
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file, held for the duration of a with block.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.path, "a+")
+        if os.name == "nt":
+            import msvcrt
+
+            self._f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        else:
+            import fcntl
+
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+
+        return self
+
+    def __exit__(self, *exc):
+        if os.name == "nt":
+            import msvcrt
+
+            self._f.seek(0)
+            msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+
+        self._f.close()
+        self._f = None
@@ -0,0 +1,169 @@
+import json
+import logging
+import random
+import time
+from collections import namedtuple
+
+from elasticsearch_runner.bulk import bulk_action
+
+"""
+Synthetic warm-up workload for a freshly started Elasticsearch node.
+
+Right after the cluster turns green the JVM has not compiled the hot paths yet, so the first requests are
+much slower than later ones. Warming up repeats small index, search and aggregation rounds against a
+scratch index until the round latency levels off or the time budget is used.
+"""
+
+_logger = logging.getLogger(__name__)
+
+WARMUP_INDEX = "elasticsearch_runner_warmup"
+
+_WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliett kilo lima mike "
+    "november oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu"
+).split()
+
+# tuple holding the latencies of one warm-up round in seconds
+WarmupRound = namedtuple("WarmupRound", "index search aggregation total")
+
+# tuple holding the outcome of a warm-up, rounds is the latency curve from cold to warm
+WarmupReport = namedtuple("WarmupReport", "rounds converged elapsed")
+
+
+def _bulk_body(docs, major_version, round_no):
+    lines = []
+    for i in range(docs):
+        lines.append(bulk_action(WARMUP_INDEX, major_version, "%d-%d" % (round_no, i)))
+        lines.append(
+            json.dumps(
+                {
+                    "body": " ".join(random.choice(_WORDS) for _ in range(12)),
+                    "value": random.randint(0, 1000),
+                }
+            )
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def converged(totals, window, tolerance):
+    """
+    Check if the last round latencies have leveled off, ie. the spread of the last window rounds is
+    within tolerance of their mean.
+
+    :param totals: Round latencies, oldest first.
+    :type totals: list[float]
+    :param window: Number of rounds to look at.
+    :type window: int
+    :param tolerance: Allowed (max - min) / mean of the window.
+    :type tolerance: float
+    :rtype : bool
+    """
+    if len(totals) < window:
+        return False
+
+    last = totals[-window:]
+    mean = sum(last) / window
+
+    return mean == 0 or (max(last) - min(last)) / mean <= tolerance
+
+
+def warm_up(
+    port,
+    version,
+    docs_per_round=200,
+    budget=30.0,
+    window=5,
+    tolerance=0.25,
+    max_rounds=500,
+):
+    """
+    Run warm-up rounds against a node until the latency levels off or the budget is used, then remove
+    the scratch index again.
+
+    :param port: REST port of the node.
+    :type port: int
+    :param version: Elasticsearch version of the node, used for the bulk format.
+    :type version: str|unicode
+    :param docs_per_round: Documents bulk indexed in each round.
+    :type docs_per_round: int
+    :param budget: Max seconds to spend on warming up.
+    :type budget: int|float
+    :param window: Number of rounds that must have similar latencies to stop early.
+    :type window: int
+    :param tolerance: Allowed (max - min) / mean of the round latencies in the window.
+    :type tolerance: float
+    :param max_rounds: Max number of rounds.
+    :type max_rounds: int
+    :rtype : WarmupReport
+    :return: The latency of every round and whether it leveled off within the budget.
+    """
+    import requests
+
+    base_url = "http://localhost:%d" % port
+    index_url = "%s/%s" % (base_url, WARMUP_INDEX)
+    major_version = int(version.split(".")[0])
+
+    session = requests.Session()
+    rounds = []
+    start = time.perf_counter()
+
+    search = {"query": {"match": {"body": random.choice(_WORDS)}}, "size": 10}
+    aggregation = {
+        "size": 0,
+        "aggs": {
+            "values": {"histogram": {"field": "value", "interval": 100}},
+            "mean": {"avg": {"field": "value"}},
+        },
+    }
+
+    try:
+        session.put(
+            index_url,
+            json={"settings": {"number_of_shards": 1, "number_of_replicas": 0}},
+        ).raise_for_status()
+
+        while len(rounds) < max_rounds:
+            t0 = time.perf_counter()
+            session.post(
+                "%s/_bulk?refresh=true" % base_url,
+                data=_bulk_body(docs_per_round, major_version, len(rounds)),
+                headers={"Content-Type": "application/x-ndjson"},
+            ).raise_for_status()
+            t1 = time.perf_counter()
+            session.post("%s/_search" % index_url, json=search).raise_for_status()
+            t2 = time.perf_counter()
+            session.post("%s/_search" % index_url, json=aggregation).raise_for_status()
+            t3 = time.perf_counter()
+
+            rounds.append(WarmupRound(t1 - t0, t2 - t1, t3 - t2, t3 - t0))
+
+            if converged([r.total for r in rounds], window, tolerance):
+                break
+
+            if time.perf_counter() - start > budget:
+                break
+    finally:
+        try:
+            session.delete(index_url)
+        finally:
+            session.close()
+
+    report = WarmupReport(
+        rounds=rounds,
+        converged=converged([r.total for r in rounds], window, tolerance),
+        elapsed=time.perf_counter() - start,
+    )
+
+    if rounds:
+        _logger.info(
+            "Warmed up Elasticsearch in %d rounds and %.1f seconds, round latency %.1f ms -> %.1f ms ..."
+            % (
+                len(rounds),
+                report.elapsed,
+                rounds[0].total * 1000,
+                rounds[-1].total * 1000,
+            )
+        )
+
+    return report
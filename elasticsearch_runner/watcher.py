@@ -0,0 +1,140 @@
+import logging
+import os
+import select
+import threading
+import time
+
+"""
+Watches the processes of a running Elasticsearch node and notices right away when they exit.
+
+The wrapper started by the runner is our child, so a thread blocks in waitpid on it. A server process that
+is not our child is watched through a pidfd where the platform supports it (Linux 5.3+), and by polling
+otherwise.
+"""
+
+_logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+
+
+def wait_for_pid(pid, stop_event=None):
+    """
+    Block until a process that is not a child of ours exits.
+
+    :param pid: Process ID
+    :type pid: int
+    :param stop_event: Event that ends the wait early when set, only checked when polling.
+    :type stop_event: threading.Event|None
+    """
+    from elasticsearch_runner.runner import process_exists
+
+    if hasattr(os, "pidfd_open"):
+        try:
+            fd = os.pidfd_open(pid)
+        except OSError:
+            # already gone, or pidfd not supported by the kernel
+            fd = None
+
+        if fd is not None:
+            try:
+                while not (stop_event and stop_event.is_set()):
+                    readable, _, _ = select.select([fd], [], [], POLL_INTERVAL)
+                    if readable:
+                        return
+            finally:
+                os.close(fd)
+            return
+
+    while process_exists(pid) and not (stop_event and stop_event.is_set()):
+        time.sleep(POLL_INTERVAL)
+
+
+class ProcessWatcher:
+    """
+    Tracks the lifecycle of a node started with Popen and reports unexpected exits.
+    """
+
+    def __init__(self, process, on_exit=None):
+        """
+        :param process: The wrapper process started by the runner.
+        :type process: subprocess.Popen
+        :param on_exit: Called with the exit code when the node exits without stop() being called.
+        :type on_exit: callable|None
+        """
+        self.process = process
+        self.on_exit = on_exit
+        self.returncode = None
+        self.exited = threading.Event()
+        self._expected = threading.Event()
+        self._server_thread = None
+
+        threading.Thread(
+            target=self._wait_child, name="elasticsearch-watcher", daemon=True
+        ).start()
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def watch_server(self, server_pid):
+        """
+        Also watch the server process, needed when the wrapper forks the JVM instead of exec'ing it.
+
+        :param server_pid: PID of the Elasticsearch server process.
+        :type server_pid: int
+        """
+        if server_pid == self.process.pid or self._server_thread:
+            return
+
+        self._server_thread = threading.Thread(
+            target=self._wait_server,
+            args=(server_pid,),
+            name="elasticsearch-server-watcher",
+            daemon=True,
+        )
+        self._server_thread.start()
+
+    def expect_exit(self):
+        """
+        Mark the coming exit as requested, so on_exit is not called for it.
+        """
+        self._expected.set()
+
+    def wait(self, timeout=None):
+        """
+        :param timeout: Max seconds to wait for the node to exit.
+        :type timeout: int|float|None
+        :rtype : bool
+        :return: True if the node exited.
+        """
+        return self.exited.wait(timeout)
+
+    def _wait_child(self):
+        self._exited(self.process.wait())
+
+    def _wait_server(self, server_pid):
+        wait_for_pid(server_pid, self.exited)
+        self._exited(None)
+
+    def _exited(self, returncode):
+        if self.exited.is_set():
+            if returncode is not None and self.returncode is None:
+                self.returncode = returncode
+            return
+
+        self.returncode = returncode
+        self.exited.set()
+
+        if self._expected.is_set():
+            return
+
+        _logger.error(
+            "Elasticsearch process %d exited unexpectedly with code %s ..."
+            % (self.process.pid, returncode)
+        )
+
+        if self.on_exit:
+            try:
+                self.on_exit(returncode)
+            except Exception:
+                _logger.exception("Elasticsearch exit callback failed ...")